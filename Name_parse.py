@@ -1,28 +1,930 @@
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import string
+import struct
+import sys
+from array import array
+
 FILENAME = "top200.csv"
 TARGETFILENAME = FILENAME[0:-4] + "_parsed.csv"
-FFfile = open(FILENAME)
-lines = FFfile.readlines()
-FFfile.close()
-newlines = []
-for l in lines:
-    splitline = l.split(',')
-    line1 = splitline[0].strip('"')
-    player_split = line1.split()
-    rank = player_split[0].rstrip('.')
-    first_name = player_split[1]
-    last_name = player_split[2].rstrip(',')
-    position = splitline[1].rstrip('"').strip()
-    newline = rank + "," + last_name + "," + first_name + "," + position + \
-              "," + splitline[2] + "," + splitline[3]
-    newlines.append(newline)
-
-newlines = ''.join(newlines)
-print newlines
-targetfile = open(TARGETFILENAME, 'w')
-targetfile.write(newlines)
-targetfile.close()
-print 'DONE!'
-
-
-    
-    
+CONSENSUSFILENAME = "consensus.csv"
+MANIFESTFILENAME = ".parse_manifest.json"
+# input rows per hashed block in incremental mode
+BLOCKSIZE = 1000
+COLUMNAREXTENSION = ".ffr"
+
+# name tokens kept with the last name instead of being read as one
+SUFFIXES = set(['jr', 'jr.', 'sr', 'sr.', 'ii', 'iii', 'iv', 'v'])
+
+def parse_name(name):
+    """
+    Splits a player name such as 'Odell Beckham Jr.' into its first and last
+    name. The first word is the first name and everything after it is the
+    last name, so multi-part last names ('Van Noy') and suffixes ('Jr.',
+    'III') stay with the last name. A comma before a suffix is dropped, so
+    'Ted Ginn, Jr.' has the last name 'Ginn Jr.'.
+
+    name: a string
+    returns: a tuple of strings (first, last)
+    """
+    words = name.split()
+    for i in xrange(len(words) - 1):
+        if words[i+1].lower() in SUFFIXES:
+            words[i] = words[i].rstrip(',')
+    if not words:
+        return ('', '')
+    if len(words) == 1:
+        return ('', words[0])
+    if len(words) == 2 and words[1].lower() in SUFFIXES:
+        return ('', ' '.join(words))
+    return (words[0], ' '.join(words[1:]))
+
+def parse_row(row):
+    """
+    Parses one row of a rankings file into the output row
+    [rank, last, first, position, extra columns...]. The first field is
+    'rank. First Last, POS'; if it holds no position, the position is read
+    from the second field instead. Any further fields are passed through.
+
+    row: a list of strings (as read by csv.reader)
+    returns: a list of strings, or None for a blank or header row
+    """
+    if not row or not row[0].strip():
+        return None
+    player = row[0].strip()
+    extra = row[1:]
+    # the last comma may set off a suffix ('Ted Ginn, Jr.'), not a position
+    if ',' in player and \
+       player.rsplit(',', 1)[1].strip().lower() not in SUFFIXES:
+        player, position = player.rsplit(',', 1)
+    elif extra:
+        position = extra[0]
+        extra = extra[1:]
+    else:
+        position = ''
+    words = player.split(None, 1)
+    rank = words[0].rstrip('.')
+    if not rank.isdigit():
+        return None
+    if len(words) > 1:
+        first, last = parse_name(words[1])
+    else:
+        first, last = ('', '')
+    return [rank, last, first, position.strip()] + \
+           [field.strip() for field in extra]
+
+def iter_rankings(f):
+    """
+    Yields the parsed rows (see parse_row) of the rankings file F one at a
+    time, skipping blank and header rows.
+
+    f: an open file object
+    yields: lists of strings
+    """
+    for row in csv.reader(f):
+        parsed = parse_row(row)
+        if parsed != None:
+            yield parsed
+
+def parse_file(source, target):
+    """
+    Parses the rankings file at path SOURCE and writes the parsed rows to a
+    CSV file at path TARGET as they are read.
+
+    source: a string
+    target: a string
+    returns: an int, the number of rows written
+    """
+    count = 0
+    infile = open(source, 'rb')
+    outfile = open(target, 'wb')
+    try:
+        writer = csv.writer(outfile, lineterminator='\n')
+        for row in iter_rankings(infile):
+            writer.writerow(row)
+            count += 1
+    finally:
+        infile.close()
+        outfile.close()
+    return count
+
+def normalize_name(first, last):
+    """
+    Returns the key used to match a player across sources: the name in lower
+    case, without punctuation or suffixes, e.g. 'odell beckham' for
+    ('Odell', 'Beckham Jr.').
+
+    first: a string
+    last: a string
+    returns: a string
+    """
+    words = []
+    for word in (first + ' ' + last).lower().split():
+        if word in SUFFIXES:
+            continue
+        word = word.translate(None, string.punctuation)
+        if word:
+            words.append(word)
+    return ' '.join(words)
+
+def normalize_position(position):
+    """
+    Returns POSITION in upper case without a positional rank, e.g. 'WR' for
+    'wr12'.
+    """
+    return position.strip().upper().rstrip(string.digits)
+
+def _parse_source(path):
+    """
+    Worker for ingest_directory. Parses the rankings file at PATH.
+
+    returns: a list of parsed rows (see parse_row)
+    """
+    f = open(path, 'rb')
+    try:
+        return list(iter_rankings(f))
+    finally:
+        f.close()
+
+def _is_source(name, extension='.csv'):
+    return name.endswith(extension) and not name.endswith('_parsed.csv') \
+           and name != CONSENSUSFILENAME
+
+def ingest_directory(directory, processes=None, extension='.csv'):
+    """
+    Parses every file in DIRECTORY ending in EXTENSION, each in a worker
+    process. Parsed output ('_parsed.csv' files and CONSENSUSFILENAME) is
+    skipped.
+
+    directory: a string
+    processes: an int or None (defaults to the number of cpus)
+    extension: a string
+    returns: a dict of file name and list of parsed rows pairs
+    """
+    names = []
+    for name in sorted(os.listdir(directory)):
+        if _is_source(name, extension):
+            names.append(name)
+    paths = [os.path.join(directory, name) for name in names]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(_parse_source, paths)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(names, results))
+
+def consensus_rankings(sources, weights=None):
+    """
+    Merges the rankings in SOURCES into one consensus ranking ordered by the
+    weighted average of each player's ranks. A player is matched across
+    sources by normalize_name and normalize_position, and averaged over the
+    sources that rank the player. Every source weighs 1 unless given in
+    WEIGHTS.
+
+    sources: a dict of source name and list of parsed rows pairs (see
+    ingest_directory)
+    weights: a dict of source name and float pairs, or None
+    returns: a list of rows [rank, last, first, position, average rank,
+    number of sources]
+    """
+    if weights == None:
+        weights = {}
+    # player key -> index into the columns below
+    index = {}
+    players = []
+    rankCol = array('d')
+    weightCol = array('d')
+    playerCol = array('i')
+    for name in sorted(sources):
+        weight = weights.get(name, 1.0)
+        for row in sources[name]:
+            position = normalize_position(row[3])
+            key = (normalize_name(row[2], row[1]), position)
+            if key not in index:
+                index[key] = len(players)
+                players.append((row[1], row[2], position))
+            rankCol.append(float(row[0]))
+            weightCol.append(weight)
+            playerCol.append(index[key])
+    # accumulate every column in one pass
+    totals = array('d', [0.0]) * len(players)
+    totalWeights = array('d', [0.0]) * len(players)
+    counts = array('i', [0]) * len(players)
+    for i in xrange(len(rankCol)):
+        player = playerCol[i]
+        totals[player] += rankCol[i] * weightCol[i]
+        totalWeights[player] += weightCol[i]
+        counts[player] += 1
+    averages = []
+    for player in xrange(len(players)):
+        if totalWeights[player] > 0:
+            averages.append((totals[player] / totalWeights[player], player))
+    averages.sort()
+    result = []
+    for rank in xrange(len(averages)):
+        average, player = averages[rank]
+        last, first, position = players[player]
+        result.append([str(rank + 1), last, first, position,
+                       '%.2f' % average, str(counts[player])])
+    return result
+
+def write_rows(rows, target):
+    """
+    Writes ROWS to a CSV file at path TARGET.
+
+    rows: an iterable of lists of strings
+    target: a string
+    """
+    outfile = open(target, 'wb')
+    try:
+        writer = csv.writer(outfile, lineterminator='\n')
+        for row in rows:
+            writer.writerow(row)
+    finally:
+        outfile.close()
+
+def _ngrams(text, n=3):
+    """
+    Returns the set of N-letter substrings of TEXT, padded with a space at
+    each end so that short names and word boundaries count too.
+    """
+    text = ' ' + text + ' '
+    return set([text[i:i+n] for i in xrange(len(text) - n + 1)])
+
+class PlayerTable(object):
+    """
+    An in-memory table of parsed rankings rows (see parse_row) indexed by
+    normalized name, position and rank, with a trigram index for fuzzy name
+    lookup. Players are numbered in the order they are added.
+    """
+    def __init__(self, rows=()):
+        """
+        Initializes a PlayerTable holding ROWS.
+
+        rows: an iterable of parsed rows
+        """
+        self.rows = []
+        # normalized name -> list of player ids
+        self.byName = {}
+        # position -> list of player ids, in order of rank once sorted
+        self.byPosition = {}
+        self._unsorted = set()
+        # rank -> list of player ids
+        self.byRank = {}
+        # trigram -> list of player ids, and each player's trigram count
+        self.ngrams = {}
+        self.gramCounts = array('i')
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        """
+        Adds the parsed row ROW to the table and every index.
+
+        row: a list of strings [rank, last, first, position, ...]
+        returns: an int, the new player's id
+        """
+        playerId = len(self.rows)
+        self.rows.append(row)
+        key = normalize_name(row[2], row[1])
+        self.byName.setdefault(key, []).append(playerId)
+        position = normalize_position(row[3])
+        self.byPosition.setdefault(position, []).append(playerId)
+        self._unsorted.add(position)
+        self.byRank.setdefault(int(row[0]), []).append(playerId)
+        grams = _ngrams(key)
+        for gram in grams:
+            self.ngrams.setdefault(gram, []).append(playerId)
+        self.gramCounts.append(len(grams))
+        return playerId
+
+    def get(self, playerId):
+        """
+        Returns the row of the player with id PLAYERID.
+        """
+        return self.rows[playerId]
+
+    def _filter(self, ids, position):
+        if position == None:
+            return [self.rows[i] for i in ids]
+        position = normalize_position(position)
+        return [self.rows[i] for i in ids
+                if normalize_position(self.rows[i][3]) == position]
+
+    def find(self, first, last, position=None):
+        """
+        Returns the rows of every player whose normalized name matches FIRST
+        and LAST (see normalize_name), only at POSITION if it is given.
+
+        returns: a list of rows
+        """
+        return self._filter(self.byName.get(normalize_name(first, last), []),
+                            position)
+
+    def find_rank(self, rank, position=None):
+        """
+        Returns the rows of every player ranked RANK, only at POSITION if it
+        is given.
+
+        rank: an int
+        returns: a list of rows
+        """
+        return self._filter(self.byRank.get(rank, []), position)
+
+    def get_position(self, position):
+        """
+        Returns the rows of every player at POSITION in order of rank.
+
+        returns: a list of rows
+        """
+        position = normalize_position(position)
+        ids = self.byPosition.get(position, [])
+        if position in self._unsorted:
+            ids.sort(key=lambda i: int(self.rows[i][0]))
+            self._unsorted.discard(position)
+        return [self.rows[i] for i in ids]
+
+    def fuzzy_find(self, name, position=None, limit=5, minScore=0.3):
+        """
+        Returns the players whose names are most like NAME, e.g. a name typed
+        with a typo or without its suffix. Names are compared by the share of
+        trigrams they have in common (Dice coefficient), counted from the
+        trigram index so only players sharing a trigram with NAME are looked
+        at.
+
+        name: a string
+        position: a string or None
+        limit: an int, the most players to return
+        minScore: a float between 0 and 1
+        returns: a list of (score, row) tuples, best first
+        """
+        query = _ngrams(normalize_name('', name))
+        shared = {}
+        for gram in query:
+            for playerId in self.ngrams.get(gram, ()):
+                shared[playerId] = shared.get(playerId, 0) + 1
+        if position != None:
+            position = normalize_position(position)
+        result = []
+        for playerId, count in shared.items():
+            row = self.rows[playerId]
+            if position != None and normalize_position(row[3]) != position:
+                continue
+            score = 2.0 * count / (len(query) + self.gramCounts[playerId])
+            if score >= minScore:
+                result.append((score, playerId))
+        result.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [(score, self.rows[playerId])
+                for score, playerId in result[:limit]]
+
+    def __len__(self):
+        return len(self.rows)
+
+def _file_sha1(path):
+    """
+    Returns the hex sha1 digest of the contents of the file at PATH, read in
+    chunks.
+    """
+    digest = hashlib.sha1()
+    f = open(path, 'rb')
+    try:
+        chunk = f.read(65536)
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(65536)
+    finally:
+        f.close()
+    return digest.hexdigest()
+
+def _iter_blocks(rows, blockSize):
+    """
+    Yields the rows of the iterable ROWS in lists of BLOCKSIZE rows.
+    """
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) == blockSize:
+            yield block
+            block = []
+    if block:
+        yield block
+
+def _block_sha1(block):
+    digest = hashlib.sha1()
+    for row in block:
+        digest.update('\x1f'.join(row))
+        digest.update('\x1e')
+    return digest.hexdigest()
+
+def load_manifest(path):
+    """
+    Returns the incremental parsing manifest stored at PATH, or an empty one
+    if there is none.
+
+    path: a string
+    returns: a dict (see parse_file_incremental)
+    """
+    if not os.path.exists(path):
+        return {}
+    f = open(path, 'rb')
+    try:
+        return json.load(f)
+    finally:
+        f.close()
+
+def save_manifest(manifest, path):
+    """
+    Writes MANIFEST to PATH, through a temporary file so that an interrupted
+    run never leaves half a manifest behind.
+    """
+    tempPath = path + '.' + str(os.getpid())
+    f = open(tempPath, 'wb')
+    try:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    finally:
+        f.close()
+    os.rename(tempPath, path)
+
+def parse_file_incremental(source, target, manifest, blockSize=BLOCKSIZE):
+    """
+    Like parse_file, but uses MANIFEST to skip work that was already done.
+    If SOURCE's mtime and size, or else its sha1, are the same as when
+    TARGET was last written, nothing is read or written. Otherwise SOURCE
+    is read in blocks of BLOCKSIZE rows; a block whose hash matches the
+    block at the same position last time has its parsed rows copied from
+    the old TARGET, and only changed blocks are parsed again.
+
+    manifest: a dict of source path and entry pairs, where each entry is a
+    dict with keys 'mtime', 'size', 'sha1', 'target', 'blockSize' and
+    'blocks' (a list of [block sha1, number of parsed rows] pairs)
+    blockSize: an int
+    returns: a tuple of ints (rows parsed, rows copied), or None if SOURCE
+    was unchanged
+    modifies: manifest
+    """
+    key = os.path.abspath(source)
+    info = os.stat(source)
+    old = manifest.get(key)
+    if old != None and (old['target'] != os.path.abspath(target) or
+                        old['blockSize'] != blockSize or
+                        not os.path.exists(target)):
+        old = None
+    if old != None and old['mtime'] == info.st_mtime and \
+            old['size'] == info.st_size:
+        return None
+    sha1 = _file_sha1(source)
+    if old != None and old['sha1'] == sha1:
+        old['mtime'] = info.st_mtime
+        old['size'] = info.st_size
+        return None
+    if old != None:
+        oldBlocks = old['blocks']
+        oldFile = open(target, 'rb')
+        oldRows = csv.reader(oldFile)
+    else:
+        oldBlocks = []
+    blocks = []
+    parsed = 0
+    copied = 0
+    tempPath = target + '.' + str(os.getpid())
+    infile = open(source, 'rb')
+    outfile = open(tempPath, 'wb')
+    try:
+        writer = csv.writer(outfile, lineterminator='\n')
+        for block in _iter_blocks(csv.reader(infile), blockSize):
+            blockHash = _block_sha1(block)
+            count = 0
+            if len(blocks) < len(oldBlocks):
+                oldHash, oldCount = oldBlocks[len(blocks)]
+                # always read past the old block to stay in step with it
+                for i in xrange(oldCount):
+                    row = oldRows.next()
+                    if oldHash == blockHash:
+                        writer.writerow(row)
+                        count += 1
+                if oldHash == blockHash:
+                    copied += count
+                    blocks.append([blockHash, count])
+                    continue
+            for row in block:
+                row = parse_row(row)
+                if row != None:
+                    writer.writerow(row)
+                    count += 1
+            parsed += count
+            blocks.append([blockHash, count])
+    finally:
+        infile.close()
+        outfile.close()
+        if old != None:
+            oldFile.close()
+    os.rename(tempPath, target)
+    manifest[key] = {'mtime': info.st_mtime, 'size': info.st_size,
+                     'sha1': sha1, 'target': os.path.abspath(target),
+                     'blockSize': blockSize, 'blocks': blocks}
+    return (parsed, copied)
+
+def update_directory(directory, blockSize=BLOCKSIZE):
+    """
+    Brings the '_parsed.csv' file of every rankings file in DIRECTORY up to
+    date with parse_file_incremental, keeping the manifest in DIRECTORY.
+
+    directory: a string
+    blockSize: an int
+    returns: a dict of file name and parse_file_incremental result pairs
+    """
+    manifestPath = os.path.join(directory, MANIFESTFILENAME)
+    manifest = load_manifest(manifestPath)
+    results = {}
+    for name in sorted(os.listdir(directory)):
+        if _is_source(name):
+            source = os.path.join(directory, name)
+            results[name] = parse_file_incremental(source,
+                    source[0:-4] + "_parsed.csv", manifest, blockSize)
+    save_manifest(manifest, manifestPath)
+    return results
+
+def read_parsed(directory):
+    """
+    Reads back the '_parsed.csv' file of every rankings file in DIRECTORY
+    (see update_directory).
+
+    returns: a dict of file name and list of parsed rows pairs
+    """
+    sources = {}
+    for name in sorted(os.listdir(directory)):
+        if _is_source(name):
+            f = open(os.path.join(directory, name[0:-4] + "_parsed.csv"), 'rb')
+            try:
+                sources[name] = list(csv.reader(f))
+            finally:
+                f.close()
+    return sources
+
+COLUMNAR_MAGIC = 'FFRK'
+COLUMNAR_VERSION = 1
+# column types
+COLUMN_INT = 0
+COLUMN_FLOAT = 1
+COLUMN_STRING = 2
+# stored for a missing value in an int column
+COLUMNAR_NULL = -2147483648
+# magic, version, rows, columns, strings, string offsets, string bytes
+_COLUMNAR_HEADER = struct.Struct('<4sI5I')
+# type, name string id, data offset
+_COLUMNAR_COLUMN = struct.Struct('<3I')
+COLUMN_NAMES = ['rank', 'last', 'first', 'position']
+
+def _intern(string, strings, stringIds):
+    """
+    Returns the id of STRING in the string table STRINGS, adding it if it is
+    not there yet.
+    """
+    try:
+        return stringIds[string]
+    except KeyError:
+        stringIds[string] = len(strings)
+        strings.append(string)
+        return stringIds[string]
+
+def _to_floats(column):
+    """
+    Returns the int column COLUMN as a float column, with NaN for
+    COLUMNAR_NULL.
+    """
+    result = array('d')
+    for value in column:
+        if value == COLUMNAR_NULL:
+            result.append(float('nan'))
+        else:
+            result.append(float(value))
+    return result
+
+def write_columnar(rows, target):
+    """
+    Writes parsed rows (see parse_row) to the columnar file TARGET, reading
+    ROWS once. Rank is stored as an int column and last, first and position
+    as string columns. Every further column becomes an int column if all of
+    its values are ints, a float column if they are all numbers, and a
+    string column otherwise. Empty and missing values are stored as
+    COLUMNAR_NULL, NaN or string id -1. See RankingsColumns for the layout.
+
+    rows: an iterable of lists of strings
+    target: a string
+    returns: an int, the number of rows written
+    """
+    values = []
+    valueIds = {}
+    # per column: the value ids, and a numeric array while every value
+    # still parses as a number (None once one does not)
+    codes = []
+    numbers = []
+    numRows = 0
+    for row in rows:
+        while len(codes) < len(row):
+            codes.append(array('i', [-1]) * numRows)
+            if 0 < len(numbers) < len(COLUMN_NAMES):
+                numbers.append(None)
+            else:
+                numbers.append(array('i', [COLUMNAR_NULL]) * numRows)
+        for c in xrange(len(codes)):
+            if c < len(row) and row[c] != '':
+                value = row[c]
+                codes[c].append(_intern(value, values, valueIds))
+            else:
+                value = None
+                codes[c].append(-1)
+            column = numbers[c]
+            if column == None:
+                continue
+            if value == None:
+                if column.typecode == 'i':
+                    column.append(COLUMNAR_NULL)
+                else:
+                    column.append(float('nan'))
+                continue
+            if column.typecode == 'i':
+                try:
+                    column.append(int(value))
+                    continue
+                except (ValueError, OverflowError):
+                    column = numbers[c] = _to_floats(column)
+            try:
+                column.append(float(value))
+            except ValueError:
+                numbers[c] = None
+        numRows += 1
+    # only the string columns' values and the column names go in the file
+    strings = []
+    stringIds = {}
+    directory = []
+    sections = []
+    for c in xrange(len(codes)):
+        if c < len(COLUMN_NAMES):
+            name = COLUMN_NAMES[c]
+        else:
+            name = 'column' + str(c)
+        nameId = _intern(name, strings, stringIds)
+        if numbers[c] == None:
+            column = codes[c]
+            for i in xrange(numRows):
+                if column[i] >= 0:
+                    column[i] = _intern(values[column[i]], strings, stringIds)
+            directory.append((COLUMN_STRING, nameId))
+        elif numbers[c].typecode == 'i':
+            column = numbers[c]
+            directory.append((COLUMN_INT, nameId))
+        else:
+            column = numbers[c]
+            directory.append((COLUMN_FLOAT, nameId))
+        sections.append(column)
+    stringOffsets = array('i', [0])
+    for string in strings:
+        stringOffsets.append(stringOffsets[-1] + len(string))
+    sections = [stringOffsets, ''.join(strings)] + sections
+    # every section starts on an 8 byte boundary so floats stay aligned
+    offsets = []
+    offset = _COLUMNAR_HEADER.size + _COLUMNAR_COLUMN.size * len(codes)
+    for section in sections:
+        offset += -offset % 8
+        offsets.append(offset)
+        if isinstance(section, array):
+            offset += len(section) * section.itemsize
+        else:
+            offset += len(section)
+    f = open(target, 'wb')
+    try:
+        f.write(_COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION,
+                                      numRows, len(codes), len(strings),
+                                      offsets[0], offsets[1]))
+        for c in xrange(len(codes)):
+            f.write(_COLUMNAR_COLUMN.pack(directory[c][0], directory[c][1],
+                                          offsets[c + 2]))
+        for i in xrange(len(sections)):
+            f.write('\0' * (offsets[i] - f.tell()))
+            section = sections[i]
+            if isinstance(section, array):
+                if sys.byteorder == 'big':
+                    section.byteswap()
+                section.tofile(f)
+            else:
+                f.write(section)
+    finally:
+        f.close()
+    return numRows
+
+class RankingsColumns(object):
+    """
+    Read-only view of a columnar rankings file written by write_columnar,
+    memory mapped so that opening it reads nothing but the header; columns
+    are decoded only when asked for.
+
+    The file is a header, a directory of (type, name string id, offset)
+    entries, one per column, and 8 byte aligned little-endian sections: the
+    int32 end offsets of the strings, the string bytes (every distinct value
+    and column name, stored once), then one section per column of
+    rows-many int32 values, float64 values or int32 string ids (-1 for
+    none).
+    """
+    def __init__(self, path):
+        """
+        Opens and maps the columnar file PATH.
+
+        path: a string
+        """
+        f = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        header = _COLUMNAR_HEADER.unpack_from(self.map, 0)
+        if header[0] != COLUMNAR_MAGIC or header[1] != COLUMNAR_VERSION:
+            self.map.close()
+            raise ValueError(path + ' is not a columnar rankings file.')
+        (self.numRows, self.numColumns, self.numStrings, self._stringOffsets,
+         self._strings) = header[2:]
+        self.columns = []
+        self.names = []
+        for c in xrange(self.numColumns):
+            entry = _COLUMNAR_COLUMN.unpack_from(self.map,
+                    _COLUMNAR_HEADER.size + _COLUMNAR_COLUMN.size * c)
+            self.columns.append(entry)
+            self.names.append(self.get_string(entry[1]))
+
+    def _array(self, typecode, offset, start, count):
+        """
+        Returns COUNT values of type TYPECODE from the section at OFFSET
+        starting at index START, as an array.
+        """
+        result = array(typecode)
+        offset += result.itemsize * start
+        result.fromstring(self.map[offset:offset + result.itemsize * count])
+        if sys.byteorder == 'big':
+            result.byteswap()
+        return result
+
+    def get_string(self, stringId):
+        """
+        Returns the string with id STRINGID, or None for -1.
+        """
+        if stringId < 0:
+            return None
+        start, end = self._array('i', self._stringOffsets, stringId, 2)
+        return self.map[self._strings + start:self._strings + end]
+
+    def __len__(self):
+        """
+        Returns the number of rows in the file.
+        """
+        return self.numRows
+
+    def get_type(self, name):
+        """
+        Returns the type of the column NAME (COLUMN_INT, COLUMN_FLOAT or
+        COLUMN_STRING).
+        """
+        return self.columns[self.names.index(name)][0]
+
+    def get_array(self, name):
+        """
+        Returns the column NAME as an array: ints or floats for a numeric
+        column, string ids (see get_string) for a string column.
+
+        name: a string (see COLUMN_NAMES; extra columns are 'column4' on)
+        returns: an array
+        """
+        columnType, nameId, offset = self.columns[self.names.index(name)]
+        if columnType == COLUMN_FLOAT:
+            return self._array('d', offset, 0, self.numRows)
+        return self._array('i', offset, 0, self.numRows)
+
+    def get_column(self, name):
+        """
+        Returns the values of the column NAME as a list: ints, floats or
+        strings, with None for a missing value.
+        """
+        values = self.get_array(name)
+        columnType = self.get_type(name)
+        if columnType == COLUMN_STRING:
+            decoded = {}
+            result = []
+            for stringId in values:
+                if stringId not in decoded:
+                    decoded[stringId] = self.get_string(stringId)
+                result.append(decoded[stringId])
+            return result
+        result = []
+        for value in values:
+            # NaN is the only float not equal to itself
+            if value != value or (columnType == COLUMN_INT and
+                                  value == COLUMNAR_NULL):
+                result.append(None)
+            else:
+                result.append(value)
+        return result
+
+    def get_row(self, rowNum):
+        """
+        Returns row ROWNUM as a list of strings like parse_row's, without
+        trailing missing values.
+        """
+        row = []
+        for columnType, nameId, offset in self.columns:
+            if columnType == COLUMN_FLOAT:
+                value = self._array('d', offset, rowNum, 1)[0]
+                if value != value:
+                    value = None
+                else:
+                    value = repr(value)
+            else:
+                value = self._array('i', offset, rowNum, 1)[0]
+                if columnType == COLUMN_STRING:
+                    value = self.get_string(value)
+                elif value == COLUMNAR_NULL:
+                    value = None
+                else:
+                    value = str(value)
+            row.append(value)
+        while row and row[-1] == None:
+            row.pop()
+        for i in xrange(len(row)):
+            if row[i] == None:
+                row[i] = ''
+        return row
+
+    def close(self):
+        self.map.close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Parses fantasy football '
+            'rankings files into rank,last,first,position,... rows.')
+    parser.add_argument('source', nargs='?', default=FILENAME,
+                        help='a rankings file, or a directory of them to '
+                        'merge into a consensus')
+    parser.add_argument('target', nargs='?')
+    parser.add_argument('--incremental', action='store_true',
+                        help='skip files and row blocks that have not '
+                        'changed since the last run')
+    parser.add_argument('--columnar', action='store_true',
+                        help='write a memory-mappable columnar file (' +
+                        COLUMNAREXTENSION + ') instead of CSV')
+    options = parser.parse_args(argv)
+    if options.columnar and options.incremental and \
+            not os.path.isdir(options.source):
+        parser.error('--incremental writes CSV for a single file')
+    if options.columnar:
+        write = write_columnar
+        extension = COLUMNAREXTENSION
+    else:
+        write = write_rows
+        extension = ".csv"
+    if os.path.isdir(options.source):
+        target = options.target or os.path.join(options.source,
+                CONSENSUSFILENAME[0:-4] + extension)
+        if options.incremental:
+            results = update_directory(options.source)
+            changed = [r for r in results.values() if r != None]
+            print str(len(changed)) + ' of ' + str(len(results)) + \
+                  ' files changed'
+            sources = read_parsed(options.source)
+        else:
+            sources = ingest_directory(options.source)
+        rows = consensus_rankings(sources)
+        write(rows, target)
+        print str(len(rows)) + ' players from ' + str(len(sources)) + \
+              ' sources written to ' + target
+    else:
+        target = options.target
+        if target == None:
+            target = options.source[0:-4] + "_parsed" + extension
+        if options.incremental:
+            manifestPath = os.path.join(os.path.dirname(target),
+                                        MANIFESTFILENAME)
+            manifest = load_manifest(manifestPath)
+            result = parse_file_incremental(options.source, target, manifest)
+            save_manifest(manifest, manifestPath)
+            if result == None:
+                print options.source + ' is unchanged'
+            else:
+                print str(result[0]) + ' rows parsed and ' + \
+                      str(result[1]) + ' rows kept in ' + target
+        elif options.columnar:
+            f = open(options.source, 'rb')
+            try:
+                count = write_columnar(iter_rankings(f), target)
+            finally:
+                f.close()
+            print str(count) + ' rows written to ' + target
+        else:
+            print str(parse_file(options.source, target)) + \
+                  ' rows written to ' + target
+    print 'DONE!'
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
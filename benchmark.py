@@ -0,0 +1,169 @@
+"""
+Benchmarks League.generate_schedule over a grid of league shapes.
+
+Every engine is run on every combination of team count, division count and
+season length, each run in its own worker process so that peak memory can be
+measured. Reports the mean time, the largest peak memory increase, the share
+of runs that failed (raised or timed out) and the share of weeks that could
+not be filled. Shapes larger than an engine can hold in memory (see
+MAX_TEAMS) are skipped unless --no-limits is given.
+
+usage: python benchmark.py [--teams 8 12 ...] [--engines v2 v4 ...]
+"""
+import argparse
+import imp
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+league_manager = imp.load_source('league_manager',
+                                 os.path.join(HERE, 'league-manager.py'))
+divisions_v2 = imp.load_source('divisions_v2',
+                               os.path.join(HERE, 'divisions.v2.py'))
+
+# engine name -> (module, method argument for generate_schedule or None)
+ENGINES = {'v2': (divisions_v2, None),
+           'v3': (league_manager, 'backtrack'),
+           'v4': (league_manager, 'search'),
+           'round_robin': (league_manager, 'round_robin')}
+
+# engine name -> most teams it is run with by default. divisions.v2.py keeps
+# a dict per pair of teams, about 350 MB at 1024 teams and four times that
+# with every doubling, allocated before the timeout can stop the run.
+MAX_TEAMS = {'v2': 1024}
+
+def build_league(module, numTeams, numDivisions):
+    """
+    Returns a League from MODULE with NUMTEAMS teams shuffled into
+    NUMDIVISIONS divisions.
+
+    module: a loaded scheduler script (league_manager or divisions_v2)
+    numTeams: an int
+    numDivisions: an int
+    returns: a League object
+    """
+    league = module.League('Benchmark')
+    for t in xrange(numTeams):
+        league.create_team('Team ' + str(t))
+    for d in xrange(numDivisions):
+        league.add_division('Division ' + str(d))
+    league.shuffle_divisions()
+    return league
+
+def run_case(args):
+    """
+    Builds one league and schedules it. Meant to run in a fresh worker
+    process, since peak memory is read from the process's own rusage.
+
+    args: a tuple (engine, numTeams, numDivisions, weeks, seed)
+    returns: a dict with keys 'time', 'peakKB', 'error' and 'unfilled'
+    """
+    engine, numTeams, numDivisions, weeks, seed = args
+    random.seed(seed)
+    module, method = ENGINES[engine]
+    league = build_league(module, numTeams, numDivisions)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    error = None
+    unfilled = 0
+    start = time.time()
+    try:
+        if method == None:
+            schedule = league.generate_schedule(weeks)
+        else:
+            schedule = league.generate_schedule(weeks, method)
+        for week in schedule:
+            if week == False:
+                unfilled += 1
+    except (RuntimeError, ValueError), e:
+        # RuntimeError: recursion limit in the v3 backtracker
+        error = type(e).__name__
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    return {'time': elapsed, 'peakKB': peak, 'error': error,
+            'unfilled': unfilled}
+
+def run_isolated(args, timeout):
+    """
+    Runs run_case(ARGS) in a new single-use worker process, giving up after
+    TIMEOUT seconds.
+
+    returns: a dict (see run_case)
+    """
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply_async(run_case, (args,)).get(timeout)
+    except multiprocessing.TimeoutError:
+        return {'time': timeout, 'peakKB': 0, 'error': 'Timeout',
+                'unfilled': 0}
+    finally:
+        pool.terminate()
+        pool.join()
+
+def valid_shape(numTeams, numDivisions):
+    """
+    Returns True if NUMTEAMS splits into NUMDIVISIONS equal divisions of an
+    even size, which every engine requires.
+    """
+    return numTeams % numDivisions == 0 and (numTeams / numDivisions) % 2 == 0
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--teams', type=int, nargs='+',
+                        default=[8, 12, 16, 32, 64, 128, 256, 512, 1024, 2048,
+                                 4096])
+    parser.add_argument('--divisions', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--weeks', type=int, nargs='+', default=[13, 17])
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES),
+                        default=['v2', 'v3', 'v4', 'round_robin'])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='seconds allowed per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', help='also write the results to this file')
+    parser.add_argument('--no-limits', action='store_true',
+                        help='run every engine on every shape, ignoring '
+                             'MAX_TEAMS')
+    options = parser.parse_args(argv)
+
+    header = ('engine', 'teams', 'divisions', 'weeks', 'mean_s', 'peak_kb',
+              'fail_rate', 'unfilled_rate')
+    rows = []
+    print '%-12s %6s %9s %5s %10s %9s %9s %13s' % header
+    for numTeams in options.teams:
+        for numDivisions in options.divisions:
+            if not valid_shape(numTeams, numDivisions):
+                continue
+            for weeks in options.weeks:
+                for engine in options.engines:
+                    if not options.no_limits and \
+                            numTeams > MAX_TEAMS.get(engine, numTeams):
+                        continue
+                    results = []
+                    for r in xrange(options.repeats):
+                        args = (engine, numTeams, numDivisions, weeks,
+                                options.seed + r)
+                        results.append(run_isolated(args, options.timeout))
+                    failures = [res for res in results if res['error']]
+                    unfilled = sum([res['unfilled'] for res in results])
+                    row = (engine, numTeams, numDivisions, weeks,
+                           sum([res['time'] for res in results]) /
+                           len(results),
+                           max([res['peakKB'] for res in results]),
+                           float(len(failures)) / len(results),
+                           float(unfilled) / (weeks * len(results)))
+                    rows.append(row)
+                    print '%-12s %6d %9d %5d %10.4f %9d %9.2f %13.2f' % row
+                    sys.stdout.flush()
+    if options.csv:
+        out = open(options.csv, 'w')
+        out.write(','.join(header) + '\n')
+        for row in rows:
+            out.write(','.join([str(value) for value in row]) + '\n')
+        out.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,3 +1,4 @@
+import random
 class League(object):
     def __init__(self, name):
         self.name = str(name)
@@ -11,12 +12,10 @@ class League(object):
         self.teams[str(team)] = team
         
     def remove_team(self, team_name):
-        team = self.teams[team_name]
         if team_name in self.teams:
-            if not team.get_division() == None:
-                team.get_division().remove_team(team)
+            move_team(self.teams[team_name], None)
             del self.teams[team_name]
-        else: raise ValueError(str(team) + ' is not in league.')
+        else: raise ValueError(team_name + ' is not in league.')
         
     def get_team(self, team_name):
         try:
@@ -34,7 +33,7 @@ class League(object):
         if division_name in self.divisions:
             self.divisions[division_name].clear_teams()
             del self.divisions[division_name]
-        else: raise ValueError(str(team) + ' is not in league.')
+        else: raise ValueError(division_name + ' is not in league.')
         
     def get_division(self, division_name):
         try:
@@ -43,57 +42,73 @@ class League(object):
             raise ValueError(division_name + ' is not in League.')
         
     def shuffle_divisions(self):
-        divs = []
-        for d in self.divisions.values():
-            d.clear_teams()
-            divs.append(d)
-        max_teams = len(self.teams) / len(divs)
-        balanced = len(self.teams) % len(divs) == 0
-        if not balanced: max_teams += 1
-        for t in self:
-            d = random.choice(divs)
-            d.add_team(t)
-            if len(d.get_teams()) >= max_teams:
-                divs.remove(d)
-                if not balanced:
-                    max_teams -= 1
-                    balanced = True
+        teams = list(self)
+        random.shuffle(teams)
+        divs = self.divisions.values()
+        random.shuffle(divs)
+        # adding a team to a division takes it out of its old one
+        for i in xrange(len(teams)):
+            divs[i % len(divs)].add_team(teams[i])
 
     def assign_team_to_division(self, team_name, division_name):
         try:
             self.divisions[division_name].add_team(self.teams[team_name])
         except KeyError:
             raise ValueError('Invalid team_name or division_name')
+
+    def reassign(self, mapping):
+        # check every move before making any, then apply them in one pass
+        moves = []
+        for team_name, division_name in mapping.items():
+            try:
+                if division_name == None: division = None
+                else: division = self.divisions[division_name]
+                moves.append((self.teams[team_name], division))
+            except KeyError:
+                raise ValueError('Invalid team_name or division_name')
+        for team, division in moves:
+            move_team(team, division)
             
     def __iter__(self):
         for t in self.teams.values():
             yield t
             
     def __str__(self):
-        result = 'League: ' + self.name + '\n'
+        lines = ['League: ' + self.name]
         for d in self.divisions.values():
-            result = result + '\t' + str(d) + '\n'
-        return result[:-1]
+            lines.append('\t' + str(d))
+        return '\n'.join(lines)
     
 class Division(League):
     def clear_teams(self):
-        for t in self: self.remove_team(t)
+        for t in self.teams.values(): move_team(t, None)
 
     def add_team(self, team):
-        team.set_division(self)
-        self.teams[str(team)] = team
+        move_team(team, self)
 
     def remove_team(self, team):
-        if str(team) in self.teams:
-            team.clear_division()
-            del self.teams[str(team)]
+        if self.teams.get(str(team)) is team:
+            move_team(team, None)
         else: raise ValueError(str(team) + ' is not in league.')
         
     def __str__(self):
-        result = 'Division: ' + self.name + '\n'
+        lines = ['Division: ' + self.name]
         for t in self:
-            result = result + '\t-' + str(t) + '\n'
-        return result[:-1]
+            lines.append('\t-' + str(t))
+        return '\n'.join(lines)
+
+def shuffle_all_divisions(leagues):
+    for league in leagues:
+        league.shuffle_divisions()
+
+def move_team(team, division):
+    # the only place team.division and Division.teams are changed, so the
+    # two always agree
+    old = team.division
+    if old is division: return
+    if not old == None: del old.teams[str(team)]
+    team.division = division
+    if not division == None: division.teams[str(team)] = team
 
 class Team(object):
     def __init__(self, name):
@@ -108,11 +123,10 @@ class Team(object):
         return self.owner
     
     def set_division(self, division):
-        if not self.division == None: self.division.remove_team(self)
-        self.division = division
+        move_team(self, division)
         
     def clear_division(self):
-        self.division = None
+        move_team(self, None)
         
     def get_division(self):
         return self.division
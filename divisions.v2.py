@@ -1,4 +1,6 @@
+import multiprocessing
 import random
+import time
 
 class League(object):
     def __init__(self, name):
@@ -11,6 +13,7 @@ class League(object):
         self.name = str(name)
         self.teams = {}
         self.divisions = set()
+        self.random = random
         
     def get_name(self):
         """
@@ -104,33 +107,32 @@ class League(object):
                 else: divisions['<Not Assigned>'] = [t.get_name(),]
         return divisions
 
-    def shuffle_divisions(self):
+    def shuffle_divisions(self, seed=None):
         """
         Randomly evenly assigns divisions from self.divisions to teams in
-        self.teams.
+        self.teams. If SEED is given, self.random is reseeded with it first
+        (see seed_random).
         Mutates the name attributes of the Team objects in self.teams
+
+        seed: a hashable object or None
         """
-        # map divisions to size (number of teams in division (initial: 0))
-        divisions = {}
-        for d in self.divisions:
-            divisions[d] = 0  
-        # calculate maximum division size
-        max_teams = len(self.teams) / len(divisions)
-        large_divs_remaining = len(self.teams) % len(divisions)
-        if large_divs_remaining > 0: max_teams += 1
-        # randomly assign a division to each team, update dict
-        for t in self:
-            d = random.choice(divisions.keys())
-            t._set_division(d)
-            divisions[d] += 1
-            # if division is full, remove it from dict, update max size
-            if divisions[d] >= max_teams:
-                del divisions[d]
-                if large_divs_remaining > 1:
-                    large_divs_remaining -= 1
-                elif large_divs_remaining == 1:
-                    max_teams -= 1
-                    large_divs_remaining = -1
+        if seed != None:
+            self.seed_random(seed)
+        self._deal_divisions(self.random)
+
+    def _deal_divisions(self, rng):
+        """
+        Shuffles the teams and the divisions with RNG and deals the teams out
+        to the divisions in turn, so division sizes differ by at most one.
+
+        rng: the random module or a random.Random object
+        """
+        teams = list(self)
+        rng.shuffle(teams)
+        divisions = sorted(self.divisions)
+        rng.shuffle(divisions)
+        for i in xrange(len(teams)):
+            teams[i]._set_division(divisions[i % len(divisions)])
 
     def assign_team_to_division(self, team_name, division_name):
         """
@@ -149,55 +151,177 @@ class League(object):
         except KeyError:
             raise ValueError(team_name + ' is not in League')
     
-    def generate_schedule(self, weeks):
+    def seed_random(self, seed):
+        """
+        Gives the league its own random number generator seeded with SEED,
+        so that shuffle_divisions and generate_schedule draw from it instead
+        of the global random module and repeat their results.
+
+        seed: a hashable object
+        """
+        self.random = random.Random(seed)
+
+    def __getstate__(self):
+        """
+        Returns the League's attributes for pickling. The random module
+        cannot be pickled, so a League still using it is unpickled with the
+        random module of the receiving process.
+        """
+        state = self.__dict__.copy()
+        if state['random'] is random:
+            del state['random']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'random' not in state:
+            self.random = random
+
+    def generate_schedule(self, weeks, seed=None):
         """
         Creates a regular season schedule of WEEKS number of weeks
         for the league. Teams are matched once against each team in their
         division and then once against each team outside their division,
         if there are weeks reamaining, the process repeats until
         all weeks are filled. Number of teams in league must be even.
+        If SEED is given, self.random is reseeded with it first (see
+        seed_random).
 
         weeks: an int
+        seed: a hashable object or None
         returns: a list of lists of matchups. (each list of matchups is a week
         in the season).
         """
+        if seed != None:
+            self.seed_random(seed)
         schedule = []
         divisions = self.get_divisions()
-        # initialize matchupFreqs dict
-        matchupFreqs = {}
-        for team in self:
-            matchupFreqs[str(team)] = {}
-            for opponent in self:
-                if not opponent == team:
-                    matchupFreqs[str(team)][str(opponent)] = {}
-                    matchupFreqs[str(team)][str(opponent)]['home'] = 0
-                    matchupFreqs[str(team)][str(opponent)]['away'] = 0
-                
+        matchupFreqs = MatchupFreqs(self)
         for w in xrange(1, weeks+1):
             schedule.append(self._generate_week(divisions, matchupFreqs,
                                                 w, weeks))
 
         return schedule
 
+    def generate_schedule_budgeted(self, weeks, timeLimit=None,
+                                   attemptLimit=None, weekAttempts=20,
+                                   seed=None):
+        """
+        Like generate_schedule, but a week the greedy matcher gets stuck on
+        is tried again with new random draws, up to WEEKATTEMPTS times. A
+        week still stuck after that usually cannot be filled given the
+        weeks before it, so the season is started over. This goes on until
+        a season is complete, TIMELIMIT seconds have passed or ATTEMPTLIMIT
+        week attempts have been made in total. Once the budget is spent,
+        every remaining week of the current season gets a single attempt.
+        The season with the fewest unfilled (False) weeks is returned. With
+        no limit, one season is made and each week is tried once. The status
+        is 'complete' if every week was filled, 'budget' if the budget ran
+        out first and 'partial' otherwise. If SEED is given, self.random is
+        reseeded with it first (see seed_random).
+
+        weeks: an int
+        timeLimit: a float (seconds) or None
+        attemptLimit: an int or None
+        weekAttempts: an int
+        seed: a hashable object or None
+        returns: a tuple (list of lists of matchups, status string)
+        """
+        if seed != None:
+            self.seed_random(seed)
+        if timeLimit != None:
+            deadline = time.time() + timeLimit
+        limited = timeLimit != None or attemptLimit != None
+        divisions = self.get_divisions()
+        best = None
+        attempts = 0
+        spent = False
+        while True:
+            schedule = []
+            matchupFreqs = MatchupFreqs(self)
+            for w in xrange(1, weeks+1):
+                for tries in xrange(weekAttempts):
+                    week = self._generate_week(divisions, matchupFreqs, w,
+                                               weeks)
+                    attempts += 1
+                    if (attemptLimit != None and attempts >= attemptLimit) \
+                            or (timeLimit != None and
+                                time.time() > deadline):
+                        spent = True
+                    if week != False or spent or not limited:
+                        break
+                schedule.append(week)
+            if best == None or schedule.count(False) < best.count(False):
+                best = schedule
+            if False not in best or spent or not limited:
+                break
+        if False not in best:
+            status = 'complete'
+        elif spent:
+            status = 'budget'
+        else:
+            status = 'partial'
+        return best, status
+
+    def generate_best_schedule(self, weeks, candidates=8, processes=None,
+                               attemptLimit=None):
+        """
+        Generates CANDIDATES schedules of WEEKS weeks in parallel worker
+        processes, each with its own random seed, and returns the one with the
+        lowest score_schedule. Each candidate is made with
+        generate_schedule_budgeted, allowed ATTEMPTLIMIT week attempts.
+        Candidates that could not be completed are discarded.
+
+        weeks: an int
+        candidates: an int
+        processes: an int or None (defaults to the number of cpus)
+        attemptLimit: an int or None (defaults to 100 attempts per week)
+        returns: a list of lists of matchups (see generate_schedule)
+        """
+        if attemptLimit == None:
+            attemptLimit = 100 * weeks
+        seed = self.random.getrandbits(32)
+        jobs = []
+        for i in xrange(candidates):
+            jobs.append((self, weeks, seed + i, attemptLimit))
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_generate_candidate, jobs)
+        finally:
+            pool.close()
+            pool.join()
+        best = None
+        for result in results:
+            if result != None and (best == None or result[0] < best[0]):
+                best = result
+        if best == None:
+            raise ValueError('No valid schedule found in ' + str(candidates) +
+                             ' candidates.')
+        schedule = []
+        for week in best[1]:
+            matchupList = []
+            for home, away in week:
+                matchupList.append(Matchup(self.teams[home], self.teams[away]))
+            schedule.append(matchupList)
+        return schedule
+
     def _generate_week(self, divisions, matchupFreqs, weekNum, totalWeeks):
         """
         Generates a list of matchups representing a week schedule. Modifies
         matchupFreqs to reflect returned matchups.
 
-        matchupFreqs: a dict of dicts of dicts. (each team is a key in the top
-        dict, which contains a dict with a key for each possible opponent, 
-        whose value is a dict with two keys: 'home' and 'away'.  The values
-        for 'home' and 'away' are ints representing the frequency of this
-        matchup.
-        e.g. matchupFreqs['Team 1']['Team 2']['home'] = 1, represents one 
+        matchupFreqs: a MatchupFreqs object holding, for every ordered pair of
+        teams, how many times the first team has hosted and visited the second.
+        e.g. matchupFreqs.get_home('Team 1', 'Team 2') = 1, represents one 
         matchup of Team 1 vs Team 2, where Team1 is the home team. In this case,
-        matchupFreqs['Team 2']['Team 1']['away'] will also equal 1.
+        matchupFreqs.get_away('Team 2', 'Team 1') will also equal 1.
         
         weekNum: an int
         totalWeeks: an int
-        returns: a list of Matchups
-        modifies: matchupFreqs
+        returns: a list of Matchups, or False if the greedy matcher got stuck
+        modifies: matchupFreqs (only when a list is returned)
         """
+        matchupFreqs.clear_used()
         maxMatchups = (weekNum // len(self.teams)) + 1
         divisionSize = len(self.teams) / len(divisions)
         if 0 < (weekNum % (len(self.teams) - 1)) < divisionSize:
@@ -209,16 +333,21 @@ class League(object):
         
     def _get_divisional_matchups(self, divisions, matchupFreqs, maxMatchups):
         matchupList = []
+        matchupFreqs.checkpoint()
         for d in divisions.keys():
             availableTeams = divisions[d][:]
-            for team in availableTeams:
-                availableTeams.remove(team)
+            while availableTeams:
+                team = availableTeams.pop(0)
                 validMatchups = self._get_valid_matchups(team, availableTeams,
                                                          matchupFreqs, 
                                                          maxMatchups)
-                toAdd = random.choice(validMatchups)
+                if validMatchups == []:
+                    matchupFreqs.rollback()
+                    return False
+                toAdd = self.random.choice(validMatchups)
                 self._add_matchup(team, toAdd, matchupList, matchupFreqs)
                 availableTeams.remove(toAdd[0])
+        matchupFreqs.commit()
         return matchupList
 
 ##    def _get_interdivisional_matchups(self, divisions, matchupFreqs, 
@@ -246,23 +375,25 @@ class League(object):
     def _get_interdivisional_matchups_v2(self, divisions, matchupFreqs, 
                                           maxMatchups):
         matchupList = []
-        usedDict = {}
-        for team in self.teams.keys():
-            usedDict[team] = False
+        matchupFreqs.checkpoint()
         for team in self:
-            if usedDict[str(team)] == True:
+            if matchupFreqs.is_used(team):
                 continue
-            usedDict[str(team)] = True
+            matchupFreqs.mark_used(team)
             tempAvail = []
             for tempTeam in self:
-                if usedDict[str(tempTeam)] == False and \
+                if not matchupFreqs.is_used(tempTeam) and \
                         tempTeam not in divisions[team.get_division()]:
                     tempAvail.append(tempTeam)
             validMatchups = self._get_valid_matchups(team, tempAvail,
                                                      matchupFreqs, maxMatchups)
-            toAdd = random.choice(validMatchups)
+            if validMatchups == []:
+                matchupFreqs.rollback()
+                return False
+            toAdd = self.random.choice(validMatchups)
             self._add_matchup(team, toAdd, matchupList, matchupFreqs)
-            usedDict[str(toAdd[0])] = True
+            matchupFreqs.mark_used(toAdd[0])
+        matchupFreqs.commit()
         return matchupList
 
     def _add_matchup(self, team, toAdd, matchupList, matchupFreqs):
@@ -281,7 +412,7 @@ class League(object):
 
         team: a Team object
         teamList: a list of Team objects
-        matchupFreqs: a dict (see _generate_week for explaination
+        matchupFreqs: a MatchupFreqs (see _generate_week for explaination)
         maxMatchups: an int
         returns: a list of tuples (Team, str)
         """
@@ -294,7 +425,7 @@ class League(object):
 
     def _check_matchup(self, team, opponent, matchupFreqs, maxMatchups):
         """
-        Checks matchupFreqs dictionary to see if a matchup is suitable to
+        Checks matchupFreqs to see if a matchup is suitable to
         schedule based on maxMatchups.  If team and opponent have played
         each other more or equal times than MAXMATCHUPS, returns False,
         otherwise returns 'home' or 'away' based on which matchup has occured
@@ -302,12 +433,12 @@ class League(object):
 
         team: a Team object
         opponent: a Team object
-        matchupFreqs: a dict (see _generate_week for explaination)
+        matchupFreqs: a MatchupFreqs (see _generate_week for explaination)
         maxMatchups: an int
         returns: one of: False or str ('home' or 'away')
         """
-        homeMatchups = matchupFreqs[str(team)][str(opponent)]['home']
-        awayMatchups = matchupFreqs[str(team)][str(opponent)]['away']
+        homeMatchups = matchupFreqs.get_home(team, opponent)
+        awayMatchups = matchupFreqs.get_away(team, opponent)
         if homeMatchups + awayMatchups >= maxMatchups:
             return False
         elif homeMatchups <= awayMatchups:
@@ -316,8 +447,7 @@ class League(object):
             return 'away'
 
     def _update_matchup_freqs(self, home, away, matchupFreqs):
-        matchupFreqs[str(home)][str(away)]['home'] += 1
-        matchupFreqs[str(away)][str(home)]['away'] += 1
+        matchupFreqs.add(home, away)
 
 
         
@@ -436,33 +566,206 @@ class Matchup(object):
         """
         return str(self.awayTeam) + ' at ' + str(self.homeTeam)
 
+class MatchupFreqs(object):
+    """
+    Records how many times each team has played each other team at home and
+    away, and which teams are already used in the week being built. Changes
+    made after checkpoint() are logged so that rollback() can undo them in
+    place.
+    """
+    def __init__(self, teams):
+        """
+        Initializes a MatchupFreqs with every count set to 0 and no team used
+        for the teams in TEAMS.
+
+        teams: an iterable of Team objects (e.g. a League)
+        """
+        teams = list(teams)
+        # team name -> opponent name -> {'home': int, 'away': int}
+        self.counts = {}
+        for team in teams:
+            self.counts[str(team)] = {}
+            for opponent in teams:
+                if not opponent == team:
+                    self.counts[str(team)][str(opponent)] = {'home': 0,
+                                                            'away': 0}
+        self.used = set()
+        # undo log of ('add', home, away) and ('use', team) entries, and the
+        # log length at each open checkpoint
+        self._log = []
+        self._checkpoints = []
+
+    def get_home(self, team, opponent):
+        """
+        Returns the number of times TEAM has hosted OPPONENT.
+        """
+        return self.counts[str(team)][str(opponent)]['home']
+
+    def get_away(self, team, opponent):
+        """
+        Returns the number of times TEAM has visited OPPONENT.
+        """
+        return self.counts[str(team)][str(opponent)]['away']
+
+    def add(self, home, away):
+        """
+        Records one matchup with HOME hosting AWAY.
+        """
+        self.counts[str(home)][str(away)]['home'] += 1
+        self.counts[str(away)][str(home)]['away'] += 1
+        if self._checkpoints:
+            self._log.append(('add', home, away))
+
+    def mark_used(self, team):
+        """
+        Marks TEAM as already playing in the week being built.
+        """
+        self.used.add(str(team))
+        if self._checkpoints:
+            self._log.append(('use', team))
+
+    def is_used(self, team):
+        """
+        Returns True if TEAM has been marked with mark_used.
+        """
+        return str(team) in self.used
+
+    def clear_used(self):
+        """
+        Unmarks every team, e.g. before building a new week.
+        """
+        self.used = set()
+
+    def checkpoint(self):
+        """
+        Starts logging changes so they can be undone with rollback().
+        Checkpoints nest; each one is closed by one rollback() or commit().
+        """
+        self._checkpoints.append(len(self._log))
+
+    def rollback(self):
+        """
+        Undoes every add and mark_used made since the latest checkpoint and
+        closes it.
+        """
+        start = self._checkpoints.pop()
+        while len(self._log) > start:
+            entry = self._log.pop()
+            if entry[0] == 'add':
+                self.counts[str(entry[1])][str(entry[2])]['home'] -= 1
+                self.counts[str(entry[2])][str(entry[1])]['away'] -= 1
+            else:
+                self.used.discard(str(entry[1]))
+
+    def commit(self):
+        """
+        Keeps the changes made since the latest checkpoint and closes it.
+        """
+        self._checkpoints.pop()
+        if not self._checkpoints:
+            del self._log[:]
+
+def shuffle_all_divisions(leagues, seed=None):
+    """
+    Reshuffles the divisions of every League in LEAGUES (see
+    League.shuffle_divisions) in one pass, drawing from a single random
+    number generator seeded with SEED, or from the random module if SEED is
+    None.
+
+    leagues: an iterable of League objects
+    seed: a hashable object or None
+    """
+    if seed != None:
+        rng = random.Random(seed)
+    else:
+        rng = random
+    for league in leagues:
+        league._deal_divisions(rng)
+
+def score_schedule(schedule):
+    """
+    Scores the fairness of a schedule; lower is better. Every team adds the
+    square of the difference between its home and away games, and every
+    rematch adds how many weeks sooner it came than a full round robin
+    (number of teams - 1 weeks) after the previous meeting.
+
+    schedule: a list of lists of matchups (see League.generate_schedule)
+    returns: an int, or None if a week of the schedule could not be filled
+    """
+    balance = {}
+    lastMet = {}
+    score = 0
+    for weekNum in xrange(len(schedule)):
+        week = schedule[weekNum]
+        if week == False:
+            return None
+        idealGap = 2 * len(week) - 1
+        for game in week:
+            home = str(game.homeTeam)
+            away = str(game.awayTeam)
+            balance[home] = balance.get(home, 0) + 1
+            balance[away] = balance.get(away, 0) - 1
+            pair = (min(home, away), max(home, away))
+            if pair in lastMet:
+                score += max(0, idealGap - (weekNum - lastMet[pair]))
+            lastMet[pair] = weekNum
+    for difference in balance.values():
+        score += difference * difference
+    return score
+
+def _generate_candidate(args):
+    """
+    Worker for League.generate_best_schedule. Seeds the league's random
+    number generator, generates one schedule with generate_schedule_budgeted
+    and scores it.
+
+    args: a tuple (League, weeks, seed, attemptLimit)
+    returns: a tuple (score, list of weeks of (home name, away name) tuples),
+    or None if the schedule could not be completed
+    """
+    league, weeks, seed, attemptLimit = args
+    schedule, status = league.generate_schedule_budgeted(weeks,
+            attemptLimit=attemptLimit, seed=seed)
+    score = score_schedule(schedule)
+    if score == None:
+        return None
+    weeks = []
+    for week in schedule:
+        weeks.append([(str(game.homeTeam), str(game.awayTeam))
+                      for game in week])
+    return (score, weeks)
+
 def print_schedule(schedule):
     for week in range(1, len(schedule)+1):
         print 'Week ' + str(week)
+        if schedule[week-1] == False:
+            print 'FALSE!'
+            continue
         for game in schedule[week-1]:
             print game
 
-grassmasters = League('Frozen Grassmasters of Lambeau')
-grassmasters.create_team('Training Camp Hookie')
-grassmasters.create_team('T-bone Chicken')
-grassmasters.create_team('Dark Helmet')
-grassmasters.create_team('Wish Sandwiches')
+if __name__ == '__main__':
+    grassmasters = League('Frozen Grassmasters of Lambeau')
+    grassmasters.create_team('Training Camp Hookie')
+    grassmasters.create_team('T-bone Chicken')
+    grassmasters.create_team('Dark Helmet')
+    grassmasters.create_team('Wish Sandwiches')
 
-grassmasters.create_team('Flaming Moes')
-grassmasters.create_team('Jello Puddin\' Pops')
-grassmasters.create_team('The Schlubs')
-grassmasters.create_team('Kentucky Clears')
+    grassmasters.create_team('Flaming Moes')
+    grassmasters.create_team('Jello Puddin\' Pops')
+    grassmasters.create_team('The Schlubs')
+    grassmasters.create_team('Kentucky Clears')
 
-grassmasters.create_team('Mother of Dragons')
-grassmasters.create_team('Demaryius Targaryen')
-grassmasters.create_team('Winter is Coming')
-grassmasters.create_team('King in the North')
+    grassmasters.create_team('Mother of Dragons')
+    grassmasters.create_team('Demaryius Targaryen')
+    grassmasters.create_team('Winter is Coming')
+    grassmasters.create_team('King in the North')
 
-grassmasters.add_division('Beer')
-grassmasters.add_division('Cheese')
-grassmasters.add_division('Sausage')
+    grassmasters.add_division('Beer')
+    grassmasters.add_division('Cheese')
+    grassmasters.add_division('Sausage')
 
-grassmasters.shuffle_divisions()
+    grassmasters.shuffle_divisions()
 
-print grassmasters
-print_schedule(grassmasters.generate_schedule(14))
+    print grassmasters
+    print_schedule(grassmasters.generate_schedule(14))
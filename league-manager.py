@@ -1,4 +1,17 @@
+import cPickle
+import datetime
+import hashlib
+import json
+import math
+import mmap
+import multiprocessing
+import os
 import random
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
 
 class League(object):
     def __init__(self, name):
@@ -11,6 +24,14 @@ class League(object):
         self.name = str(name)
         self.teams = {}
         self.divisions = set()
+        # division name (None for unassigned) -> dict of team name and Team
+        # pairs, kept up to date by every method that moves teams
+        self._divisionMembers = {None: {}}
+        self.stats = None
+        # how the last week search ended (see _get_interdivisional_matchups_v4)
+        self.lastSearchResult = None
+        self.random = random
+        self._nextId = 0
         
     def get_name(self):
         """
@@ -30,13 +51,18 @@ class League(object):
         
     def create_team(self, team_name):
         """
-        Instantiates a new Team object and sets its name to TEAM_NAME.
+        Instantiates a new Team object and sets its name to TEAM_NAME and its
+        id to the next unused integer id of the league.
         Adds key of TEAM_NAME to self.names and sets its value to the new
         Team object.
 
         team_name: a string 
         """
-        self.teams[team_name] = Team(team_name)
+        if team_name in self.teams:
+            self.remove_team(team_name)
+        self.teams[team_name] = Team(team_name, self._nextId)
+        self._divisionMembers[None][team_name] = self.teams[team_name]
+        self._nextId += 1
         
     def remove_team(self, team_name):
         """
@@ -46,6 +72,8 @@ class League(object):
         team_name: a string in self.teams.keys()
         """
         if team_name in self.teams:
+            del self._divisionMembers[self._division_key(
+                self.teams[team_name])][team_name]
             del self.teams[team_name]
         else: raise ValueError(team_name + ' is not in league.')
         
@@ -75,7 +103,17 @@ class League(object):
 
         division_name: a string
         """
+        if division_name in self.divisions:
+            return
         self.divisions.add(division_name)
+        members = {}
+        unassigned = self._divisionMembers[None]
+        # teams still naming this division (e.g. after it was removed) rejoin
+        for team_name, team in unassigned.items():
+            if team.get_division() == division_name:
+                members[team_name] = team
+                del unassigned[team_name]
+        self._divisionMembers[division_name] = members
         
     def remove_division(self, division_name):
         """
@@ -85,6 +123,8 @@ class League(object):
         """
         if division_name in self.divisions:
             self.divisions.remove(division_name)
+            self._divisionMembers[None].update(
+                self._divisionMembers.pop(division_name))
         else: raise ValueError(division_name + ' is not a division in league.')
         
     def get_divisions(self):
@@ -95,42 +135,93 @@ class League(object):
         """
         divisions = {}
         for d in self.divisions:
-            divisions[d] = []
-        for t in self:
-            try: divisions[t.get_division()].append(t.get_name())
-            except KeyError:
-                if '<Not Assigned>' in divisions:
-                    divisions['<Not Assigned>'].append(t.get_name())
-                else: divisions['<Not Assigned>'] = [t.get_name(),]
+            divisions[d] = self._divisionMembers[d].keys()
+        if self._divisionMembers[None]:
+            divisions['<Not Assigned>'] = self._divisionMembers[None].keys()
         return divisions
 
-    def shuffle_divisions(self):
+    def _get_division_teams(self):
         """
-        Randomly evenly assigns divisions from self.divisions to teams in
-        self.teams.
-        Mutates the name attributes of the Team objects in self.teams
+        Returns a dict of division name and list of member Team objects
+        pairs, in the same layout as get_divisions. Used by the scheduler,
+        which works with Team objects and their ids rather than names.
+
+        returns: a dict
         """
-        # map divisions to size (number of teams in division (initial: 0))
         divisions = {}
         for d in self.divisions:
-            divisions[d] = 0  
-        # calculate maximum division size
-        max_teams = len(self.teams) / len(divisions)
-        large_divs_remaining = len(self.teams) % len(divisions)
-        if large_divs_remaining > 0: max_teams += 1
-        # randomly assign a division to each team, update dict
-        for t in self:
-            d = random.choice(divisions.keys())
-            t._set_division(d)
-            divisions[d] += 1
-            # if division is full, remove it from dict, update max size
-            if divisions[d] >= max_teams:
-                del divisions[d]
-                if large_divs_remaining > 1:
-                    large_divs_remaining -= 1
-                elif large_divs_remaining == 1:
-                    max_teams -= 1
-                    large_divs_remaining = -1
+            divisions[d] = self._divisionMembers[d].values()
+        if self._divisionMembers[None]:
+            divisions['<Not Assigned>'] = self._divisionMembers[None].values()
+        return divisions
+
+    def get_division_members(self, division_name):
+        """
+        Returns a dict of team name and Team object pairs for the teams in
+        division DIVISION_NAME. The dict is the league's own index and must
+        not be changed.
+
+        division_name: a string in self.divisions
+        returns: a dict
+        """
+        try:
+            return self._divisionMembers[division_name]
+        except KeyError:
+            raise ValueError(division_name + ' is not a division in league')
+
+    def in_same_division(self, team, opponent):
+        """
+        Returns True if TEAM and OPPONENT are both in the same division of
+        the league.
+
+        team: a Team object
+        opponent: a Team object
+        returns: a bool
+        """
+        division = team.get_division()
+        return division == opponent.get_division() and \
+               division in self.divisions
+
+    def _division_key(self, team):
+        """
+        Returns the key of self._divisionMembers that TEAM is filed under.
+        """
+        division = team.get_division()
+        if division in self.divisions:
+            return division
+        return None
+
+    def shuffle_divisions(self, seed=None):
+        """
+        Randomly evenly assigns divisions from self.divisions to teams in
+        self.teams. If SEED is given, self.random is reseeded with it first
+        (see seed_random).
+        Mutates the name attributes of the Team objects in self.teams
+
+        seed: a hashable object or None
+        """
+        if seed != None:
+            self.seed_random(seed)
+        self._deal_divisions(self.random)
+
+    def _deal_divisions(self, rng):
+        """
+        Shuffles the teams and the divisions with RNG and deals the teams out
+        to the divisions in turn, so division sizes differ by at most one.
+
+        rng: the random module or a random.Random object
+        """
+        teams = list(self)
+        rng.shuffle(teams)
+        divisions = sorted(self.divisions)
+        rng.shuffle(divisions)
+        self._divisionMembers = {None: {}}
+        for d in divisions:
+            self._divisionMembers[d] = {}
+        for i in xrange(len(teams)):
+            division = divisions[i % len(divisions)]
+            teams[i]._set_division(division)
+            self._divisionMembers[division][teams[i].get_name()] = teams[i]
 
     def assign_team_to_division(self, team_name, division_name):
         """
@@ -143,85 +234,401 @@ class League(object):
         """
         try:
             if division_name in self.divisions:
-                self.teams[team_name]._set_division(division_name)
+                self._move_team(self.teams[team_name], division_name)
             else: raise ValueError(division_name +
                     ' is not a division in league')
         except KeyError:
             raise ValueError(team_name + ' is not in League')
+
+    def reassign(self, mapping):
+        """
+        Moves many teams between divisions at once. Every entry of MAPPING is
+        checked before any team is moved, so an invalid entry leaves the
+        league unchanged.
+
+        mapping: a dict of team name and division name (or None to unassign)
+        pairs
+        """
+        for team_name, division_name in mapping.items():
+            if team_name not in self.teams:
+                raise ValueError(team_name + ' is not in League')
+            if division_name != None and division_name not in self.divisions:
+                raise ValueError(division_name + ' is not a division in league')
+        for team_name, division_name in mapping.items():
+            self._move_team(self.teams[team_name], division_name)
+
+    def _move_team(self, team, division_name):
+        """
+        Sets TEAM's division to DIVISION_NAME and moves it to the matching
+        entry of self._divisionMembers.
+        """
+        del self._divisionMembers[self._division_key(team)][team.get_name()]
+        team._set_division(division_name)
+        self._divisionMembers[self._division_key(team)][team.get_name()] = team
     
-    def generate_schedule(self, weeks):
+    def seed_random(self, seed):
+        """
+        Gives the league its own random number generator seeded with SEED,
+        so that shuffle_divisions and generate_schedule draw from it instead
+        of the global random module and repeat their results.
+
+        seed: a hashable object
+        """
+        self.random = random.Random(seed)
+
+    def __getstate__(self):
+        """
+        Returns the League's attributes for pickling. The random module
+        cannot be pickled, so a League still using it is unpickled with the
+        random module of the receiving process.
+        """
+        state = self.__dict__.copy()
+        if state['random'] is random:
+            del state['random']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'random' not in state:
+            self.random = random
+
+    def generate_schedule(self, weeks, method='search', fixedWeeks=None,
+                          seed=None, cache=None):
         """
         Creates a regular season schedule of WEEKS number of weeks
         for the league. Teams are matched once against each team in their
         division and then once against each team outside their division,
         if there are weeks reamaining, the process repeats until
         all weeks are filled. Number of teams in league must be even.
+        If METHOD is 'round_robin' the season is built directly with
+        _iter_round_robin instead of being searched for week by week.
+        'backtrack' searches interdivisional weeks with the older recursive
+        _get_interdivisional_matchups_v3 instead of v4.
+        Weeks given in FIXEDWEEKS are used as they are and counted against
+        the other weeks' matchups (see repair_schedule).
+        If SEED is given, self.random is reseeded with it first (see
+        seed_random). If a ScheduleCache is given as CACHE along with SEED,
+        the result is looked up there first and stored there afterwards.
 
         weeks: an int
+        method: a string ('search', 'backtrack' or 'round_robin')
+        fixedWeeks: a dict of week number (starting at 1) and list of Matchups
+        pairs, or None
+        seed: a hashable object or None
+        cache: a ScheduleCache or None
         returns: a list of lists of matchups. (each list of matchups is a week
         in the season).
         """
-        schedule = []
-        divisions = self.get_divisions()
-        # initialize matchupFreqs dict
-        matchupFreqs = {}
+        if seed != None:
+            self.seed_random(seed)
+            if cache != None and not fixedWeeks:
+                key = cache.make_key(self, weeks, seed, method)
+                cached = cache.get(key)
+                if cached != None:
+                    return _schedule_from_names(self, cached)
+                schedule = self.generate_schedule(weeks, method)
+                cache.put(key, _schedule_to_names(schedule))
+                return schedule
+        return list(self.iter_schedule(weeks, method, fixedWeeks))
+
+    def generate_schedule_budgeted(self, weeks, timeLimit=None,
+                                   nodeLimit=None, method='search', seed=None):
+        """
+        Like generate_schedule, but stops searching after TIMELIMIT seconds or
+        NODELIMIT search nodes (pairings tried), whichever comes first, and
+        returns whatever it has at that point. Weeks that could not be filled,
+        or were not reached before the budget ran out, are False. The status
+        is 'complete' if every week was filled, 'partial' if the search ran
+        to the end but left some weeks unfilled, and 'budget' if it was cut
+        short.
+
+        weeks: an int
+        timeLimit: a float (seconds) or None
+        nodeLimit: an int or None
+        method: a string (see generate_schedule)
+        seed: a hashable object or None
+        returns: a tuple (list of lists of Matchups, status string)
+        """
+        if seed != None:
+            self.seed_random(seed)
+        budget = ScheduleBudget(timeLimit, nodeLimit)
+        schedule = list(self.iter_schedule(weeks, method, budget=budget))
+        while len(schedule) < weeks:
+            schedule.append(False)
+        if False not in schedule:
+            status = 'complete'
+        elif budget.is_spent():
+            status = 'budget'
+        else:
+            status = 'partial'
+        return schedule, status
+
+    def iter_schedule(self, weeks, method='search', fixedWeeks=None,
+                      matchupFreqs=None, startWeek=1, budget=None,
+                      seed=None):
+        """
+        Generator version of generate_schedule: yields each week's list of
+        matchups as soon as it has been generated, for weeks STARTWEEK through
+        WEEKS. To resume an interrupted season, pass the MatchupFreqs the
+        earlier run was using (e.g. unpickled) as MATCHUPFREQS and the first
+        week still to generate as STARTWEEK. When MATCHUPFREQS is None a new
+        one is made and seeded with FIXEDWEEKS. If a ScheduleBudget is given
+        as BUDGET, the search draws from it and stops once it is spent. If
+        SEED is given, self.random is reseeded with it first (see
+        seed_random).
+        A 'round_robin' season ignores MATCHUPFREQS: its teams are shuffled
+        afresh from self.random, so it can only be resumed (STARTWEEK > 1)
+        with the SEED it was started with; without one a ValueError is
+        raised.
+
+        weeks: an int
+        method: a string (see generate_schedule)
+        fixedWeeks: a dict (see generate_schedule) or None
+        matchupFreqs: a MatchupFreqs or None
+        startWeek: an int
+        budget: a ScheduleBudget or None
+        seed: a hashable object or None
+        yields: lists of Matchups (or False for a week that could not be
+        filled)
+        modifies: matchupFreqs
+        """
+        if seed != None:
+            self.seed_random(seed)
+        if method == 'round_robin':
+            if fixedWeeks:
+                raise ValueError('round_robin schedules cannot keep weeks.')
+            if startWeek > 1 and seed == None:
+                raise ValueError('round_robin schedules can only be resumed '
+                                 'with the seed they were started with.')
+            for week in self._iter_round_robin(weeks, startWeek):
+                yield week
+            return
+        elif method not in ('search', 'backtrack'):
+            raise ValueError(str(method) + ' is not a scheduling method.')
+        if fixedWeeks == None:
+            fixedWeeks = {}
+        divisions = self._get_division_teams()
+        if matchupFreqs == None:
+            matchupFreqs = MatchupFreqs(self)
+            for week in fixedWeeks.values():
+                for game in week:
+                    matchupFreqs.add(game.homeTeam, game.awayTeam)
+        stats = self.stats
+        for w in xrange(startWeek, weeks+1):
+            if w in fixedWeeks:
+                yield fixedWeeks[w]
+                continue
+            if budget != None and budget.is_spent():
+                return
+            if stats != None:
+                start = time.time()
+            week = self._generate_week(divisions, matchupFreqs, w, weeks,
+                                       method, budget)
+            if stats != None:
+                stats.record_week(w, time.time() - start, week != False)
+            yield week
+
+    def repair_schedule(self, schedule, lockedWeeks, weeks=None,
+                        method='search'):
+        """
+        Regenerates SCHEDULE after the league has changed (teams created or
+        removed, divisions reassigned) without touching the weeks in
+        LOCKEDWEEKS, e.g. weeks already played or locked by the commissioner.
+        Games in locked weeks involving a team no longer in the league are
+        dropped. Every other week is generated again, taking the locked
+        weeks' matchups into account.
+
+        schedule: a list of lists of matchups (see generate_schedule)
+        lockedWeeks: an iterable of week numbers (starting at 1)
+        weeks: an int, the new season length (defaults to len(schedule))
+        method: a string ('search' or 'backtrack', see generate_schedule)
+        returns: a list of lists of matchups (see generate_schedule)
+        """
+        if weeks == None:
+            weeks = len(schedule)
+        fixedWeeks = {}
+        for w in lockedWeeks:
+            if not 1 <= w <= min(weeks, len(schedule)):
+                raise ValueError('Week ' + str(w) + ' is not in schedule.')
+            if schedule[w-1] == False:
+                continue
+            fixedWeeks[w] = []
+            for game in schedule[w-1]:
+                if self.teams.get(game.homeTeam.name) is game.homeTeam and \
+                        self.teams.get(game.awayTeam.name) is game.awayTeam:
+                    fixedWeeks[w].append(game)
+        return self.generate_schedule(weeks, method, fixedWeeks)
+
+    def optimize_schedule(self, schedule, timeLimit=1.0, maxIterations=None,
+                          seed=None):
+        """
+        Improves SCHEDULE by simulated annealing (see ScheduleOptimizer) for
+        at most TIMELIMIT seconds and returns the best schedule found, which
+        scores no worse than SCHEDULE under score_schedule. Draws from
+        self.random unless SEED is given.
+
+        schedule: a list of lists of matchups (see generate_schedule)
+        timeLimit: a float, in seconds
+        maxIterations: an int or None
+        seed: a hashable object or None
+        returns: a list of lists of matchups
+        """
+        if seed != None:
+            rng = random.Random(seed)
+        else:
+            rng = self.random
+        optimizer = ScheduleOptimizer(self, schedule, rng)
+        optimizer.run(timeLimit, maxIterations)
+        return optimizer.get_best_schedule()
+
+    def generate_best_schedule(self, weeks, candidates=8, processes=None,
+                               method='search'):
+        """
+        Generates CANDIDATES schedules of WEEKS weeks in parallel worker
+        processes, each with its own random seed, and returns the one with the
+        lowest score_schedule. Candidates that could not be completed are
+        discarded.
+
+        weeks: an int
+        candidates: an int
+        processes: an int or None (defaults to the number of cpus)
+        method: a string (see generate_schedule)
+        returns: a list of lists of matchups (see generate_schedule)
+        """
+        seed = self.random.getrandbits(32)
+        jobs = []
+        for i in xrange(candidates):
+            jobs.append((self, weeks, method, seed + i))
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_generate_candidate, jobs)
+        finally:
+            pool.close()
+            pool.join()
+        best = None
+        for result in results:
+            if result != None and (best == None or result[0] < best[0]):
+                best = result
+        if best == None:
+            raise ValueError('No valid schedule found in ' + str(candidates) +
+                             ' candidates.')
+        teamsById = {}
         for team in self:
-            matchupFreqs[str(team)] = {}
-            for opponent in self:
-                if not opponent == team:
-                    matchupFreqs[str(team)][str(opponent)] = {}
-                    matchupFreqs[str(team)][str(opponent)]['home'] = 0
-                    matchupFreqs[str(team)][str(opponent)]['away'] = 0
-                
-        for w in xrange(1, weeks+1):
-            schedule.append(self._generate_week(divisions, matchupFreqs,
-                                                w, weeks))
+            teamsById[team.id] = team
+        schedule = []
+        for week in best[1]:
+            matchupList = []
+            for home, away in week:
+                matchupList.append(Matchup(teamsById[home], teamsById[away]))
+            schedule.append(matchupList)
         return schedule
 
-    def _generate_week(self, divisions, matchupFreqs, weekNum, totalWeeks):
+    def _iter_round_robin(self, weeks, startWeek=1):
+        """
+        Creates a schedule of WEEKS weeks in which every team plays every
+        other team exactly once in each len(self.teams) - 1 weeks, and each
+        further pass swaps home and away. Teams are shuffled first. When the
+        divisions are all the same even size and every team is in one, the
+        pass starts with the divisional weeks, like _generate_week: each
+        division plays its own round robin (the circle method), then every
+        week pairs teams from different divisions only. Otherwise the
+        circle method is run over the whole league, with the rounds richest
+        in divisional games first. Yields the weeks from STARTWEEK through
+        WEEKS.
+
+        weeks: an int
+        startWeek: an int
+        yields: lists of Matchups
+        """
+        if len(self.teams) % 2 != 0 or len(self.teams) == 0:
+            raise ValueError('Number of teams in league must be even.')
+        # relabel: shuffle division order and team order within divisions
+        divisions = self._get_division_teams()
+        divisionNames = divisions.keys()
+        self.random.shuffle(divisionNames)
+        order = []
+        for d in divisionNames:
+            members = divisions[d][:]
+            self.random.shuffle(members)
+            order.extend(members)
+        sizes = set([len(divisions[d]) for d in divisionNames])
+        if '<Not Assigned>' not in divisions and len(sizes) == 1 and \
+                sizes.pop() % 2 == 0:
+            rounds = _divisional_rounds(len(divisionNames),
+                                        len(order) / len(divisionNames))
+        else:
+            rounds = _circle_rounds(len(order))
+            # play the rounds heavy in divisional games first
+            def divisional_games(games):
+                count = 0
+                for home, away in games:
+                    if self.in_same_division(order[home], order[away]):
+                        count += 1
+                return count
+            rounds.sort(key=divisional_games, reverse=True)
+        numRounds = len(rounds)
+        for w in xrange(startWeek - 1, weeks):
+            flip = (w // numRounds) % 2 == 1
+            matchupList = []
+            for home, away in rounds[w % numRounds]:
+                if flip:
+                    home, away = away, home
+                matchupList.append(Matchup(order[home], order[away]))
+            yield matchupList
+
+    def _generate_week(self, divisions, matchupFreqs, weekNum, totalWeeks,
+                       method='search', budget=None):
         """
         Generates a list of matchups representing a week schedule. Modifies
         matchupFreqs to reflect returned matchups.
 
-        matchupFreqs: a dict of dicts of dicts. (each team is a key in the top
-        dict, which contains a dict with a key for each possible opponent, 
-        whose value is a dict with two keys: 'home' and 'away'.  The values
-        for 'home' and 'away' are ints representing the frequency of this
-        matchup.
-        e.g. matchupFreqs['Team 1']['Team 2']['home'] = 1, represents one 
+        matchupFreqs: a MatchupFreqs object holding, for every ordered pair of
+        teams, how many times the first team has hosted and visited the second.
+        e.g. matchupFreqs.get_home('Team 1', 'Team 2') = 1, represents one 
         matchup of Team 1 vs Team 2, where Team1 is the home team. In this case,
-        matchupFreqs['Team 2']['Team 1']['away'] will also equal 1.
+        matchupFreqs.get_away('Team 2', 'Team 1') will also equal 1.
         
         weekNum: an int
         totalWeeks: an int
-        returns: a list of Matchups
+        method: a string ('search' or 'backtrack', see generate_schedule)
+        budget: a ScheduleBudget or None
+        returns: a list of Matchups, or False if the week could not be filled
         modifies: matchupFreqs
         """
+        matchupFreqs.clear_used()
         maxMatchups = (weekNum // len(self.teams)) + 1
         divisionSize = len(self.teams) / len(divisions)
-        usedDict = {}
-        for team in self.teams.keys():
-            usedDict[team] = False
         if 0 < (weekNum % (len(self.teams) - 1)) < divisionSize:
-            return self._get_divisional_matchups(divisions, matchupFreqs,
-                                                 maxMatchups)
+            if method == 'backtrack':
+                return self._get_divisional_matchups(divisions, matchupFreqs,
+                                                     maxMatchups)
+            return self._get_interdivisional_matchups_v4(divisions,
+                    matchupFreqs, maxMatchups, divisional=True, budget=budget)
+        elif method == 'backtrack':
+            return self._get_interdivisional_matchups_v3(divisions,
+                    matchupFreqs, maxMatchups, [], budget)
         else:
-            assert sum(usedDict.values()) == 0
-            return self._get_interdivisional_matchups_v3(divisions, 
-                    matchupFreqs, maxMatchups, usedDict, [])
+            return self._get_interdivisional_matchups_v4(divisions,
+                    matchupFreqs, maxMatchups, budget=budget)
         
     def _get_divisional_matchups(self, divisions, matchupFreqs, maxMatchups):
         matchupList = []
+        matchupFreqs.checkpoint()
         for d in divisions.keys():
             availableTeams = divisions[d][:]
-            for team in availableTeams:
-                availableTeams.remove(team)
+            while availableTeams:
+                team = availableTeams.pop(0)
                 validMatchups = self._get_valid_matchups(team, availableTeams,
                                                          matchupFreqs, 
                                                          maxMatchups)
-                toAdd = random.choice(validMatchups)
+                if validMatchups == []:
+                    # greedy dead end: undo the week instead of raising
+                    matchupFreqs.rollback()
+                    return False
+                toAdd = self.random.choice(validMatchups)
                 self._add_matchup(team, toAdd, matchupList, matchupFreqs)
                 availableTeams.remove(toAdd[0])
+        matchupFreqs.commit()
         return matchupList
 
 ##    def _get_interdivisional_matchups(self, divisions, matchupFreqs, 
@@ -269,47 +676,176 @@ class League(object):
 ##        return matchupList
 ##
     def _get_interdivisional_matchups_v3(self, divisions, matchupFreqs,
-                                         maxMatchups, usedDict, ignoreList):
+                                         maxMatchups, ignoreList, budget=None):
         currentTeam = None
         for team in self:
-            if usedDict[str(team)] == False:
+            if not matchupFreqs.is_used(team):
                 currentTeam = team
                 break
         if currentTeam == None:
             return []
+        elif budget != None and not budget.spend():
+            return False
         else:
-            print 'current team: ' + str(currentTeam)
-            tempUsedDict = usedDict.copy()
-            tempUsedDict[str(team)] = True
+            stats = self.stats
+            matchupFreqs.checkpoint()
+            matchupFreqs.mark_used(currentTeam)
             tempAvail = []
             for team in self:
-                if tempUsedDict[str(team)] == False and \
-                        team not in divisions[currentTeam.get_division()] and \
+                if not matchupFreqs.is_used(team) and \
+                        not self.in_same_division(team, currentTeam) and \
                         team not in ignoreList:
                     tempAvail.append(team)
             validMatchups = self._get_valid_matchups(currentTeam, tempAvail,
                                                      matchupFreqs, maxMatchups)
-            print str(len(ignoreList)) + ' to ignore.'
-            print 'available teams: ' + str(len(tempAvail))
-            print 'valid teams: ' + str(len(validMatchups))
+            if stats != None:
+                stats.record_node(sum(matchupFreqs.used) // 2,
+                                  len(validMatchups))
             if validMatchups == []:
-                print 'reached end, returning False'
+                matchupFreqs.rollback()
                 return False
             else:
-                tempMatchupFreqs = matchupFreqs.copy()
-                toAdd = random.choice(validMatchups)
+                toAdd = self.random.choice(validMatchups)
                 matchup = self._create_matchup(currentTeam, toAdd, 
-                                               tempMatchupFreqs)
-                tempUsedDict[str(toAdd[0])] = True
+                                               matchupFreqs)
+                matchupFreqs.mark_used(toAdd[0])
                 recurse = self._get_interdivisional_matchups_v3(divisions,
-                        tempMatchupFreqs, maxMatchups, tempUsedDict, [])
+                        matchupFreqs, maxMatchups, [], budget)
                 if recurse == False:
+                    if stats != None:
+                        stats.record_backtrack()
+                    matchupFreqs.rollback()
                     ignoreList.append(toAdd[0])
                     return self._get_interdivisional_matchups_v3(divisions,
-                            matchupFreqs, maxMatchups, usedDict, ignoreList)
-                elif type(recurse) == list:
+                            matchupFreqs, maxMatchups, ignoreList, budget)
+                else:
+                    matchupFreqs.commit()
                     return [matchup,] + recurse
 
+    def _get_interdivisional_matchups_v4(self, divisions, matchupFreqs,
+                                         maxMatchups, nodeLimit=None,
+                                         divisional=False, budget=None):
+        """
+        Pairs every team in the league with an opponent from another division
+        using an iterative depth-first search. At each step the unpaired team
+        with the fewest valid opponents is paired first, and a branch is
+        abandoned as soon as any unpaired team has no valid opponent left.
+        matchupFreqs is updated in place and rolled back (see
+        MatchupFreqs.checkpoint) on backtrack. Gives up
+        after NODELIMIT pairings have been tried, or once BUDGET is spent.
+        If DIVISIONAL is True every team is paired within its own division
+        instead.
+
+        Both ways of failing return False, so self.lastSearchResult records
+        which one happened: 'matched' when a list is returned, 'infeasible'
+        when every pairing was tried and none fills the week, and 'gave_up'
+        when the node limit or budget ran out first.
+
+        divisions: a dict (see get_divisions)
+        matchupFreqs: a MatchupFreqs (see _generate_week for explaination)
+        maxMatchups: an int
+        nodeLimit: an int or None (defaults to 100 pairings per team)
+        divisional: a bool
+        budget: a ScheduleBudget or None
+        returns: a list of Matchups, or False if no matching was found
+        modifies: matchupFreqs (only when a list is returned)
+        """
+        teams = list(self)
+        if len(teams) % 2 != 0:
+            self.lastSearchResult = 'infeasible'
+            return False
+        if nodeLimit == None:
+            nodeLimit = 100 * len(teams)
+        # pairing two teams only changes the counts between those two, so each
+        # team's valid opponents can be found once up front. remaining holds
+        # how many of them are still unpaired.
+        validDict = {}
+        remaining = {}
+        for team in teams:
+            tempAvail = []
+            for opponent in teams:
+                if opponent is team:
+                    continue
+                if divisional:
+                    valid = self._division_key(team) == \
+                            self._division_key(opponent)
+                else:
+                    valid = not self.in_same_division(team, opponent)
+                if valid:
+                    tempAvail.append(opponent)
+            validDict[team] = self._get_valid_matchups(team, tempAvail,
+                                                       matchupFreqs,
+                                                       maxMatchups)
+            remaining[team] = len(validDict[team])
+        matchupList = []
+        # each frame is [team, list of (opponent, 'home'/'away'), next option]
+        # and every matchup in matchupList has its own open checkpoint
+        stack = []
+        nodes = 0
+        stats = self.stats
+        while 2 * len(matchupList) < len(teams):
+            # pick the most constrained unpaired team
+            currentTeam = None
+            for team in teams:
+                if not matchupFreqs.is_used(team) and (currentTeam == None or
+                        remaining[team] < remaining[currentTeam]):
+                    currentTeam = team
+                    if remaining[team] == 0:
+                        break
+            currentOptions = []
+            for toAdd in validDict[currentTeam]:
+                if not matchupFreqs.is_used(toAdd[0]):
+                    currentOptions.append(toAdd)
+            self.random.shuffle(currentOptions)
+            if stats != None:
+                stats.record_node(len(stack), len(currentOptions))
+            stack.append([currentTeam, currentOptions, 0])
+            # take the next untried option, backtracking through exhausted
+            # frames
+            while stack:
+                frame = stack[-1]
+                if frame[2] > 0:
+                    matchupList.pop()
+                    matchupFreqs.rollback()
+                    for team in (frame[0], frame[1][frame[2]-1][0]):
+                        for option in validDict[team]:
+                            remaining[option[0]] += 1
+                if frame[2] < len(frame[1]):
+                    toAdd = frame[1][frame[2]]
+                    frame[2] += 1
+                    matchupFreqs.checkpoint()
+                    matchupList.append(self._create_matchup(frame[0], toAdd,
+                                                            matchupFreqs))
+                    for team in (frame[0], toAdd[0]):
+                        matchupFreqs.mark_used(team)
+                        for option in validDict[team]:
+                            remaining[option[0]] -= 1
+                    nodes += 1
+                    break
+                stack.pop()
+                if stats != None:
+                    stats.record_backtrack()
+            if not stack:
+                result = 'infeasible'
+            elif 2 * len(matchupList) == len(teams):
+                # a full week found on the last allowed node still counts
+                break
+            elif nodes > nodeLimit or (budget != None and
+                                       not budget.spend()):
+                result = 'gave_up'
+            else:
+                continue
+            for matchup in matchupList:
+                matchupFreqs.rollback()
+            self.lastSearchResult = result
+            if stats != None and result == 'gave_up':
+                stats.record_gave_up()
+            return False
+        for matchup in matchupList:
+            matchupFreqs.commit()
+        self.lastSearchResult = 'matched'
+        return matchupList
+
     def _create_matchup(self, team, toAdd, matchupFreqs):
         if toAdd[1] == 'home':
             self._update_matchup_freqs(team, toAdd[0], matchupFreqs)
@@ -334,20 +870,15 @@ class League(object):
 
         team: a Team object
         teamList: a list of Team objects
-        matchupFreqs: a dict (see _generate_week for explaination
+        matchupFreqs: a MatchupFreqs (see _generate_week for explaination)
         maxMatchups: an int
         returns: a list of tuples (Team, str)
         """
-        result = []
-        for opponent in teamList:
-            test = self._check_matchup(team, opponent, matchupFreqs, maxMatchups)
-            if test != False:
-                result.append((opponent, test))
-        return result
+        return matchupFreqs.get_valid_matchups(team, teamList, maxMatchups)
 
     def _check_matchup(self, team, opponent, matchupFreqs, maxMatchups):
         """
-        Checks matchupFreqs dictionary to see if a matchup is suitable to
+        Checks matchupFreqs to see if a matchup is suitable to
         schedule based on maxMatchups.  If team and opponent have played
         each other more or equal times than MAXMATCHUPS, returns False,
         otherwise returns 'home' or 'away' based on which matchup has occured
@@ -355,22 +886,14 @@ class League(object):
 
         team: a Team object
         opponent: a Team object
-        matchupFreqs: a dict (see _generate_week for explaination)
+        matchupFreqs: a MatchupFreqs (see _generate_week for explaination)
         maxMatchups: an int
         returns: one of: False or str ('home' or 'away')
         """
-        homeMatchups = matchupFreqs[str(team)][str(opponent)]['home']
-        awayMatchups = matchupFreqs[str(team)][str(opponent)]['away']
-        if homeMatchups + awayMatchups >= maxMatchups:
-            return False
-        elif homeMatchups <= awayMatchups:
-            return 'home'
-        else:
-            return 'away'
+        return matchupFreqs.check(team, opponent, maxMatchups)
 
     def _update_matchup_freqs(self, home, away, matchupFreqs):
-        matchupFreqs[str(home)][str(away)]['home'] += 1
-        matchupFreqs[str(away)][str(home)]['away'] += 1
+        matchupFreqs.add(home, away)
 
 
         
@@ -390,16 +913,7 @@ class League(object):
 
         returns: a string
         """
-        result = 'League Name: ' + self.name + '\nTeams and Divisions:\n'
-        divisions = self.get_divisions()
-        sorted_divs = sorted(divisions.keys(), key=str.lower)
-        for d in sorted_divs:
-            result = result + 'Division Name: ' + d + '\n'
-            if len(divisions[d]) > 0:
-                for t in divisions[d]:
-                    result = result + '\t' + t + '\n'
-            else: result = result + '\t<empty>\n'
-        return result[:-1]
+        return ''.join(_league_text(self))[:-1]
             
 class Team(object):
     """
@@ -407,16 +921,20 @@ class Team(object):
     Teams should be created within League objects with the League.create_team
     method.
     """
-    def __init__(self, name):
+    __slots__ = ('name', 'owner', 'division', 'id')
+
+    def __init__(self, name, teamId=None):
         """
-        Initializes a Team with the given name and sets its initial owner and
-        division to None
+        Initializes a Team with the given name and id and sets its initial
+        owner and division to None
 
         name: a string
+        teamId: an int, unique within the team's League
         """
         self.name = str(name)
         self.owner = None
         self.division = None
+        self.id = teamId
 
     def get_name(self):
         """
@@ -426,6 +944,14 @@ class Team(object):
         """
         return self.name
 
+    def get_id(self):
+        """
+        Returns the integer id the team's League gave it.
+
+        returns: an int
+        """
+        return self.id
+
     def set_owner(self, owner):
         """
         Sets the name of the team's owner to OWNER.
@@ -459,6 +985,16 @@ class Team(object):
         """
         return self.division    
 
+    def __getstate__(self):
+        """
+        Returns the Team's attributes for pickling. Needed, along with
+        __setstate__, for pickle protocols 0 and 1 because of __slots__.
+        """
+        return (self.name, self.owner, self.division, self.id)
+
+    def __setstate__(self, state):
+        self.name, self.owner, self.division, self.id = state
+
     def __str__(self):
         """
         Returns a string representation of a Team (its name)
@@ -468,6 +1004,8 @@ class Team(object):
         return self.name
 
 class Matchup(object):
+    __slots__ = ('homeTeam', 'awayTeam', 'homeScore', 'awayScore')
+
     def __init__(self, home, away):
         """
         Initialize a Matchup object representing a matchup between fantasy
@@ -481,6 +1019,16 @@ class Matchup(object):
         self.homeScore = None
         self.awayScore = None
 
+    def __getstate__(self):
+        """
+        Returns the Matchup's attributes for pickling (see
+        Team.__getstate__).
+        """
+        return (self.homeTeam, self.awayTeam, self.homeScore, self.awayScore)
+
+    def __setstate__(self, state):
+        self.homeTeam, self.awayTeam, self.homeScore, self.awayScore = state
+
     def __str__(self):
         """
         Returns a string representation of a Matchup.
@@ -489,36 +1037,1836 @@ class Matchup(object):
         """
         return str(self.awayTeam) + ' at ' + str(self.homeTeam)
 
-def print_schedule(schedule):
-    for week in range(1, len(schedule)+1):
-        print 'Week ' + str(week)
-        if schedule[week-1] == False:
-            print 'FALSE!'
+class MatchupFreqs(object):
+    """
+    Records how many times each team has played each other team at home and
+    away. Counts are kept in one flat array of ints laid out as an
+    N x N x 2 matrix indexed by team id: the entry at ((i * N) + j) * 2 is
+    the number of times team i has hosted team j and the entry after it is
+    the number of times team i has visited team j.
+
+    It also marks which teams are already used in the week being built.
+    Changes made after checkpoint() are logged, so a search can make them in
+    place and undo them with rollback() in time proportional to the number
+    of changes, or keep them with commit().
+    """
+    def __init__(self, teams):
+        """
+        Initializes a MatchupFreqs with every count set to 0 and no team used
+        for the teams in TEAMS.
+
+        teams: an iterable of Team objects (e.g. a League)
+        """
+        self.size = 0
+        for team in teams:
+            if team.id >= self.size:
+                self.size = team.id + 1
+        self.counts = array('i', [0]) * (self.size * self.size * 2)
+        self.used = array('b', [0]) * self.size
+        # undo log of ('add', home, away) and ('use', team) entries, and the
+        # log length at each open checkpoint
+        self._log = []
+        self._checkpoints = []
+
+    def _offset(self, team, opponent):
+        return (team.id * self.size + opponent.id) * 2
+
+    def get_home(self, team, opponent):
+        """
+        Returns the number of times TEAM has hosted OPPONENT.
+
+        returns: an int
+        """
+        return self.counts[self._offset(team, opponent)]
+
+    def get_away(self, team, opponent):
+        """
+        Returns the number of times TEAM has visited OPPONENT.
+
+        returns: an int
+        """
+        return self.counts[self._offset(team, opponent) + 1]
+
+    def get_total(self, team, opponent):
+        """
+        Returns the number of times TEAM and OPPONENT have played.
+
+        returns: an int
+        """
+        offset = self._offset(team, opponent)
+        return self.counts[offset] + self.counts[offset + 1]
+
+    def add(self, home, away):
+        """
+        Records one matchup with HOME hosting AWAY.
+
+        home: a Team object
+        away: a Team object
+        """
+        self.counts[self._offset(home, away)] += 1
+        self.counts[self._offset(away, home) + 1] += 1
+        if self._checkpoints:
+            self._log.append(('add', home, away))
+
+    def remove(self, home, away):
+        """
+        Undoes one matchup previously recorded with add(HOME, AWAY).
+
+        home: a Team object
+        away: a Team object
+        """
+        self.counts[self._offset(home, away)] -= 1
+        self.counts[self._offset(away, home) + 1] -= 1
+
+    def mark_used(self, team):
+        """
+        Marks TEAM as already playing in the week being built.
+
+        team: a Team object
+        """
+        self.used[team.id] = 1
+        if self._checkpoints:
+            self._log.append(('use', team))
+
+    def is_used(self, team):
+        """
+        Returns True if TEAM has been marked with mark_used.
+        """
+        return self.used[team.id] == 1
+
+    def clear_used(self):
+        """
+        Unmarks every team, e.g. before building a new week. Must not be
+        called while a checkpoint is open.
+        """
+        self.used = array('b', [0]) * self.size
+
+    def checkpoint(self):
+        """
+        Starts logging changes so they can be undone with rollback().
+        Checkpoints nest; each one is closed by one rollback() or commit().
+        """
+        self._checkpoints.append(len(self._log))
+
+    def rollback(self):
+        """
+        Undoes every add and mark_used made since the latest checkpoint and
+        closes it.
+        """
+        start = self._checkpoints.pop()
+        log = self._log
+        while len(log) > start:
+            entry = log.pop()
+            if entry[0] == 'add':
+                self.remove(entry[1], entry[2])
+            else:
+                self.used[entry[1].id] = 0
+
+    def commit(self):
+        """
+        Keeps the changes made since the latest checkpoint and closes it. They
+        can still be undone by rolling back an enclosing checkpoint.
+        """
+        self._checkpoints.pop()
+        if not self._checkpoints:
+            del self._log[:]
+
+    def check(self, team, opponent, maxMatchups):
+        """
+        Returns False if TEAM and OPPONENT have already played MAXMATCHUPS
+        times, otherwise 'home' or 'away' based on which matchup has occured
+        less for TEAM. Tie goes to 'home'.
+
+        returns: one of: False or str ('home' or 'away')
+        """
+        offset = self._offset(team, opponent)
+        homeMatchups = self.counts[offset]
+        awayMatchups = self.counts[offset + 1]
+        if homeMatchups + awayMatchups >= maxMatchups:
+            return False
+        elif homeMatchups <= awayMatchups:
+            return 'home'
+        else:
+            return 'away'
+
+    def get_valid_matchups(self, team, teamList, maxMatchups):
+        """
+        Returns a list of (opponent, 'home' or 'away') tuples for every team
+        in TEAMLIST that TEAM can still play, scanning only TEAM's row of the
+        matrix.
+
+        team: a Team object
+        teamList: a list of Team objects
+        maxMatchups: an int
+        returns: a list of tuples (Team, str)
+        """
+        counts = self.counts
+        rowStart = team.id * self.size
+        result = []
+        for opponent in teamList:
+            offset = (rowStart + opponent.id) * 2
+            homeMatchups = counts[offset]
+            awayMatchups = counts[offset + 1]
+            if homeMatchups + awayMatchups < maxMatchups:
+                if homeMatchups <= awayMatchups:
+                    result.append((opponent, 'home'))
+                else:
+                    result.append((opponent, 'away'))
+        return result
+
+class ScheduleBudget(object):
+    """
+    A limit on the work a budgeted scheduling run may do (see
+    League.generate_schedule_budgeted), shared by every week of the season.
+    """
+    def __init__(self, timeLimit=None, nodeLimit=None):
+        """
+        Initializes a ScheduleBudget that runs out TIMELIMIT seconds from now
+        or after NODELIMIT nodes. A limit of None is never reached.
+
+        timeLimit: a float or None
+        nodeLimit: an int or None
+        """
+        if timeLimit == None:
+            self.deadline = None
         else:
-            for game in schedule[week-1]:
-                    print game
+            self.deadline = time.time() + timeLimit
+        self.nodesLeft = nodeLimit
+        self.spent = False
+
+    def spend(self):
+        """
+        Uses up one search node. Returns False once the budget is spent.
+        """
+        if self.nodesLeft != None:
+            self.nodesLeft -= 1
+            if self.nodesLeft < 0:
+                self.spent = True
+        if self.deadline != None and time.time() > self.deadline:
+            self.spent = True
+        return not self.spent
+
+    def is_spent(self):
+        """
+        Returns True if the time or node limit has been reached.
+        """
+        if not self.spent and self.deadline != None and \
+                time.time() > self.deadline:
+            self.spent = True
+        return self.spent
+
+class SchedulerStats(object):
+    """
+    Collects counters from League.generate_schedule. Assign an instance to
+    League.stats to turn collection on; while League.stats is None the
+    scheduler skips all of it.
+    """
+    def __init__(self):
+        """
+        Initializes a SchedulerStats with every counter at 0.
+        """
+        self.nodes = 0
+        self.backtracks = 0
+        self.failedWeeks = 0
+        # failed weeks where the search hit its limit rather than proving
+        # that no week exists
+        self.gaveUpWeeks = 0
+        # depth -> [nodes at that depth, total valid candidates seen]
+        self.candidatesByDepth = {}
+        # list of (week number, seconds spent generating it)
+        self.weekTimes = []
+
+    def record_node(self, depth, candidates):
+        """
+        Records one search node at DEPTH (number of matchups already made this
+        week) that had CANDIDATES valid opponents to choose from.
+
+        depth: an int
+        candidates: an int
+        """
+        self.nodes += 1
+        try:
+            entry = self.candidatesByDepth[depth]
+        except KeyError:
+            entry = self.candidatesByDepth[depth] = [0, 0]
+        entry[0] += 1
+        entry[1] += candidates
+
+    def record_backtrack(self):
+        """
+        Records that the search abandoned a branch.
+        """
+        self.backtracks += 1
+
+    def record_gave_up(self):
+        """
+        Records that a week search stopped at its node limit or budget.
+        """
+        self.gaveUpWeeks += 1
+
+    def record_week(self, weekNum, seconds, filled):
+        """
+        Records that week WEEKNUM took SECONDS to generate, and whether a full
+        week of matchups was FILLED.
+
+        weekNum: an int
+        seconds: a float
+        filled: a bool
+        """
+        self.weekTimes.append((weekNum, seconds))
+        if not filled:
+            self.failedWeeks += 1
+
+    def as_dict(self):
+        """
+        Returns the collected counters as a dict of plain values, suitable
+        for logging or json.dump.
+
+        returns: a dict
+        """
+        averages = {}
+        for depth, entry in self.candidatesByDepth.items():
+            averages[depth] = float(entry[1]) / entry[0]
+        return {'nodes': self.nodes,
+                'backtracks': self.backtracks,
+                'failedWeeks': self.failedWeeks,
+                'gaveUpWeeks': self.gaveUpWeeks,
+                'avgCandidatesByDepth': averages,
+                'weekTimes': list(self.weekTimes),
+                'totalTime': sum([t for w, t in self.weekTimes])}
+
+    def __str__(self):
+        """
+        Returns a short multi-line summary of the collected counters.
+
+        returns: a string
+        """
+        lines = ['nodes: ' + str(self.nodes),
+                 'backtracks: ' + str(self.backtracks),
+                 'failed weeks: ' + str(self.failedWeeks),
+                 'gave up weeks: ' + str(self.gaveUpWeeks)]
+        for weekNum, seconds in self.weekTimes:
+            lines.append('week ' + str(weekNum) + ': %.4fs' % seconds)
+        return '\n'.join(lines)
+
+class ScheduleCache(object):
+    """
+    Remembers generated schedules by league shape (team names and divisions),
+    season length, seed and scheduling method. Recently used schedules are
+    kept in memory, up to MAXSIZE of them; if a DIRECTORY is given every
+    schedule is also written there as a pickle file and read back on a
+    memory miss.
+    """
+    def __init__(self, maxSize=128, directory=None):
+        """
+        Initializes an empty ScheduleCache.
+
+        maxSize: an int, the number of schedules kept in memory
+        directory: a string path to an existing directory, or None
+        """
+        self.maxSize = maxSize
+        self.directory = directory
+        self.entries = OrderedDict()
+
+    def make_key(self, league, weeks, seed, method):
+        """
+        Returns the cache key for scheduling LEAGUE for WEEKS weeks with
+        SEED and METHOD.
+
+        returns: a string
+        """
+        shape = sorted([(t.get_name(), t.get_division()) for t in league])
+        return hashlib.sha1(repr((shape, weeks, seed, method))).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key):
+        """
+        Returns the schedule stored under KEY (see _schedule_to_names), or
+        None if there is none.
+        """
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            if self.directory == None or not os.path.exists(self._path(key)):
+                return None
+            f = open(self._path(key), 'rb')
+            try:
+                value = cPickle.load(f)
+            finally:
+                f.close()
+        self.entries[key] = value
+        self._evict()
+        return value
+
+    def put(self, key, value):
+        """
+        Stores the schedule VALUE (see _schedule_to_names) under KEY.
+        """
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        self._evict()
+        if self.directory != None:
+            # write to a temporary file first so readers never see half a file
+            tempPath = self._path(key) + '.' + str(os.getpid())
+            f = open(tempPath, 'wb')
+            try:
+                cPickle.dump(value, f, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            os.rename(tempPath, self._path(key))
+
+    def _evict(self):
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empties the in-memory tier. Files on disk are left alone.
+        """
+        self.entries.clear()
+
+class LeagueStore(object):
+    """
+    Holds many leagues at once in shared columns instead of one object graph
+    per league. Teams get store-wide integer ids; their names, owners,
+    leagues and divisions are kept in lists and arrays indexed by that id,
+    and each league keeps an array of its team ids. A league's division is
+    stored as an index into that league's sorted list of division names
+    (-1 when unassigned).
+
+    get_league builds a League view of one league on demand, whose Team ids
+    are positions in the league's team id array; put_league writes changes
+    made to a view back into the columns. Bulk operations work on the
+    columns directly or in a pool of worker processes.
+    """
+    def __init__(self):
+        """
+        Initializes an empty LeagueStore.
+        """
+        self.leagueNames = []
+        self.leagueDivisions = []
+        self.leagueTeams = []
+        self.teamNames = []
+        self.teamOwners = []
+        self.teamLeague = array('i')
+        self.teamDivision = array('i')
+        # league id -> schedule of (home team id, away team id) weeks
+        self.schedules = {}
+
+    def add_league(self, name):
+        """
+        Adds an empty league named NAME.
+
+        name: a string
+        returns: an int, the new league's id
+        """
+        self.leagueNames.append(str(name))
+        self.leagueDivisions.append([])
+        self.leagueTeams.append(array('i'))
+        return len(self.leagueNames) - 1
+
+    def add_division(self, leagueId, division_name):
+        """
+        Adds a division named DIVISION_NAME to league LEAGUEID.
+
+        leagueId: an int
+        division_name: a string
+        """
+        divisions = self.leagueDivisions[leagueId]
+        if division_name in divisions:
+            return
+        old = list(divisions)
+        divisions.append(division_name)
+        divisions.sort()
+        # keep the stored division indexes pointing at the same names
+        for teamId in self.leagueTeams[leagueId]:
+            if self.teamDivision[teamId] >= 0:
+                self.teamDivision[teamId] = divisions.index(
+                    old[self.teamDivision[teamId]])
+
+    def add_team(self, leagueId, team_name, owner=None, division_name=None):
+        """
+        Adds a team named TEAM_NAME to league LEAGUEID.
+
+        leagueId: an int
+        team_name: a string
+        owner: a string or None
+        division_name: a string in the league's divisions, or None
+        returns: an int, the new team's id
+        """
+        if division_name == None:
+            division = -1
+        else:
+            try:
+                division = self.leagueDivisions[leagueId].index(division_name)
+            except ValueError:
+                raise ValueError(division_name + ' is not a division in league')
+        teamId = len(self.teamNames)
+        self.teamNames.append(str(team_name))
+        self.teamOwners.append(owner)
+        self.teamLeague.append(leagueId)
+        self.teamDivision.append(division)
+        self.leagueTeams[leagueId].append(teamId)
+        return teamId
+
+    def remove_team(self, teamId):
+        """
+        Removes team TEAMID from its league. Its columns are left in place
+        (marked with league -1) so other team ids stay valid.
+
+        teamId: an int
+        """
+        leagueId = self.teamLeague[teamId]
+        if leagueId < 0:
+            raise ValueError(str(teamId) + ' is not in a league.')
+        self.leagueTeams[leagueId].remove(teamId)
+        self.teamLeague[teamId] = -1
+        self.teamDivision[teamId] = -1
+
+    def add_from_league(self, league):
+        """
+        Copies LEAGUE into the store.
+
+        league: a League object
+        returns: an int, the new league's id
+        """
+        leagueId = self.add_league(league.get_name())
+        for d in league.divisions:
+            self.add_division(leagueId, d)
+        for team in league:
+            division = team.get_division()
+            if division not in league.divisions:
+                division = None
+            self.add_team(leagueId, team.get_name(), team.get_owner(),
+                          division)
+        return leagueId
+
+    def get_league(self, leagueId):
+        """
+        Returns a League built from the columns of league LEAGUEID. The Team
+        with id i is the store's team self.leagueTeams[leagueId][i].
+
+        leagueId: an int
+        returns: a League object
+        """
+        league = League(self.leagueNames[leagueId])
+        divisions = self.leagueDivisions[leagueId]
+        for d in divisions:
+            league.add_division(d)
+        for teamId in self.leagueTeams[leagueId]:
+            team_name = self.teamNames[teamId]
+            league.create_team(team_name)
+            if self.teamOwners[teamId] != None:
+                league.get_team(team_name).set_owner(self.teamOwners[teamId])
+            if self.teamDivision[teamId] >= 0:
+                league.assign_team_to_division(
+                    team_name, divisions[self.teamDivision[teamId]])
+        return league
+
+    def put_league(self, leagueId, league):
+        """
+        Writes the teams, owners and divisions of LEAGUE (e.g. a view from
+        get_league that has been changed) back into league LEAGUEID. Teams
+        are matched by name; teams no longer in LEAGUE are removed, and so
+        are divisions. A team whose division was removed from LEAGUE is
+        stored as unassigned.
+
+        leagueId: an int
+        league: a League object
+        """
+        self.leagueNames[leagueId] = league.get_name()
+        divisions = sorted(league.divisions)
+        self.leagueDivisions[leagueId] = divisions
+        existing = {}
+        for teamId in self.leagueTeams[leagueId]:
+            existing[self.teamNames[teamId]] = teamId
+        for team in league:
+            try:
+                teamId = existing.pop(team.get_name())
+            except KeyError:
+                teamId = self.add_team(leagueId, team.get_name())
+            self.teamOwners[teamId] = team.get_owner()
+            # a team keeps the name of a removed division until it is moved
+            if team.get_division() in league.divisions:
+                self.teamDivision[teamId] = divisions.index(
+                    team.get_division())
+            else:
+                self.teamDivision[teamId] = -1
+        for teamId in existing.values():
+            self.remove_team(teamId)
+
+    def add_schedule(self, leagueId, schedule):
+        """
+        Stores SCHEDULE, a schedule of Matchups for a League view of league
+        LEAGUEID (see League.generate_schedule), in self.schedules. Teams are
+        matched by name.
+
+        leagueId: an int
+        schedule: a list of lists of matchups
+        """
+        teamIds = {}
+        for teamId in self.leagueTeams[leagueId]:
+            teamIds[self.teamNames[teamId]] = teamId
+        result = []
+        for week in schedule:
+            if week == False:
+                result.append(False)
+            else:
+                result.append([(teamIds[game.homeTeam.get_name()],
+                                teamIds[game.awayTeam.get_name()])
+                               for game in week])
+        self.schedules[leagueId] = result
+
+    def save(self, path):
+        """
+        Writes the store and its schedules to the snapshot file PATH (see
+        LeagueSnapshot for the layout).
+
+        path: a string
+        """
+        strings = []
+        stringIds = {}
+        def intern(string):
+            try:
+                return stringIds[string]
+            except KeyError:
+                stringIds[string] = len(strings)
+                strings.append(string)
+                return stringIds[string]
+        leagues = array('i')
+        divisions = array('i')
+        leagueTeams = array('i')
+        for leagueId in xrange(len(self.leagueNames)):
+            leagues.extend((intern(self.leagueNames[leagueId]),
+                            len(divisions),
+                            len(self.leagueDivisions[leagueId]),
+                            len(leagueTeams),
+                            len(self.leagueTeams[leagueId])))
+            for d in self.leagueDivisions[leagueId]:
+                divisions.append(intern(d))
+            leagueTeams.extend(self.leagueTeams[leagueId])
+        teams = array('i')
+        for teamId in xrange(len(self.teamNames)):
+            if self.teamOwners[teamId] == None:
+                owner = -1
+            else:
+                owner = intern(str(self.teamOwners[teamId]))
+            teams.extend((intern(self.teamNames[teamId]), owner,
+                          self.teamLeague[teamId], self.teamDivision[teamId]))
+        schedules = array('i')
+        scheduleData = array('i')
+        for leagueId in xrange(len(self.leagueNames)):
+            schedule = self.schedules.get(leagueId, None)
+            if schedule == None:
+                schedules.extend((-1, -1, 0))
+                continue
+            # slots come from the stored weeks, not the current team count,
+            # which may have changed since the league was scheduled
+            data, weeks, slots = schedule_to_array(schedule)
+            schedules.extend((len(scheduleData), weeks, slots))
+            scheduleData.extend(data)
+        stringOffsets = array('i', [0])
+        for string in strings:
+            stringOffsets.append(stringOffsets[-1] + len(string))
+        blob = ''.join(strings)
+        blob += '\0' * (-len(blob) % 4)
+        sections = [stringOffsets, blob, leagues, divisions, leagueTeams,
+                    teams, schedules, scheduleData]
+        offsets = []
+        offset = _SNAPSHOT_HEADER.size
+        for section in sections:
+            offsets.append(offset)
+            if isinstance(section, array):
+                offset += len(section) * 4
+            else:
+                offset += len(section)
+        f = open(path, 'wb')
+        try:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                          len(self.leagueNames),
+                                          len(self.teamNames), len(strings),
+                                          len(divisions), len(leagueTeams),
+                                          len(scheduleData), *offsets))
+            for section in sections:
+                if isinstance(section, array):
+                    if sys.byteorder == 'big':
+                        section.byteswap()
+                    section.tofile(f)
+                else:
+                    f.write(section)
+        finally:
+            f.close()
+
+    def __len__(self):
+        """
+        Returns the number of leagues in the store.
+        """
+        return len(self.leagueNames)
+
+    def shuffle_all(self, seed=None):
+        """
+        Reshuffles the divisions of every league (see
+        League.shuffle_divisions) by rewriting the division column directly.
+
+        seed: a hashable object or None
+        """
+        if seed != None:
+            rng = random.Random(seed)
+        else:
+            rng = random
+        teamDivision = self.teamDivision
+        for leagueId in xrange(len(self.leagueNames)):
+            numDivisions = len(self.leagueDivisions[leagueId])
+            if numDivisions == 0:
+                continue
+            teams = list(self.leagueTeams[leagueId])
+            rng.shuffle(teams)
+            divisions = range(numDivisions)
+            rng.shuffle(divisions)
+            for i in xrange(len(teams)):
+                teamDivision[teams[i]] = divisions[i % numDivisions]
+
+    def schedule_all(self, weeks, method='search', seed=None, processes=None):
+        """
+        Generates a schedule of WEEKS weeks for every league in a pool of
+        worker processes and stores them in self.schedules as lists of weeks
+        of (home team id, away team id) tuples. A league whose schedule
+        could not be generated maps to None, an unfilled week to False.
+
+        weeks: an int
+        method: a string (see League.generate_schedule)
+        seed: a hashable object or None; league i is seeded with (seed, i)
+        processes: an int or None (defaults to the number of cpus)
+        returns: the dict self.schedules
+        """
+        jobs = []
+        for leagueId in xrange(len(self.leagueNames)):
+            if seed == None:
+                jobs.append((leagueId, weeks, method, None))
+            else:
+                jobs.append((leagueId, weeks, method, (seed, leagueId)))
+        for leagueId, schedule in self._map(_schedule_store_league, jobs,
+                                            processes):
+            self.schedules[leagueId] = schedule
+        return self.schedules
+
+    def render_all(self, f, processes=None):
+        """
+        Writes the string representation of every league (see
+        League.__str__) to the file-like object F, rendering in a pool of
+        worker processes.
+
+        f: a file-like object
+        processes: an int or None (defaults to the number of cpus)
+        """
+        jobs = xrange(len(self.leagueNames))
+        for leagueId, text in self._map(_render_store_league, jobs,
+                                        processes):
+            f.write(text)
+            f.write('\n')
+
+    def _map(self, function, jobs, processes):
+        """
+        Runs FUNCTION over JOBS in a pool of worker processes, yielding the
+        results in order. Workers are forked with this store in
+        _poolStore, so it is not pickled for every job.
+        """
+        global _poolStore
+        _poolStore = self
+        pool = multiprocessing.Pool(processes)
+        try:
+            for result in pool.imap(function, jobs, 16):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+            _poolStore = None
+
+SNAPSHOT_MAGIC = 'FFLS'
+SNAPSHOT_VERSION = 1
+# week slots of a week that could not be filled
+SNAPSHOT_UNFILLED = -2
+# magic, version, 6 counts (leagues, teams, strings, division entries,
+# league team entries, schedule ints), 8 section offsets in bytes
+_SNAPSHOT_HEADER = struct.Struct('<4sI6I8I')
+
+class LeagueSnapshot(object):
+    """
+    Read-only view of a snapshot file written by LeagueStore.save, memory
+    mapped so that opening it reads nothing but the header; rows are decoded
+    only when asked for.
+
+    The file is a header followed by little-endian int32 sections: string
+    end offsets and the string bytes (names, owners and division names,
+    each stored once), leagues (name, first division, division count, first
+    team, team count), division name ids, team ids per league, teams (name,
+    owner or -1, league, division index or -1), schedules per league
+    (first int, weeks, slots per week, or -1, -1, 0 for none) and the
+    schedule data, week x slot x (home team id, away team id), padded with
+    -1 and filled with SNAPSHOT_UNFILLED for unfilled weeks.
+    """
+    def __init__(self, path):
+        """
+        Opens and maps the snapshot file PATH.
+
+        path: a string
+        """
+        f = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        header = _SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        if header[0] != SNAPSHOT_MAGIC or header[1] != SNAPSHOT_VERSION:
+            self.map.close()
+            raise ValueError(path + ' is not a league snapshot.')
+        (self.numLeagues, self.numTeams, self.numStrings, self.numDivisions,
+         self.numLeagueTeams, self.numScheduleInts) = header[2:8]
+        (self._stringOffsets, self._strings, self._leagues, self._divisions,
+         self._leagueTeams, self._teams, self._schedules,
+         self._scheduleData) = header[8:]
+
+    def _ints(self, section, start, count):
+        """
+        Returns COUNT ints from SECTION starting at index START, as an array.
+        """
+        offset = section + 4 * start
+        result = array('i')
+        result.fromstring(self.map[offset:offset + 4 * count])
+        if sys.byteorder == 'big':
+            result.byteswap()
+        return result
+
+    def get_string(self, stringId):
+        """
+        Returns the string with id STRINGID, or None for -1.
+        """
+        if stringId < 0:
+            return None
+        start, end = self._ints(self._stringOffsets, stringId, 2)
+        return self.map[self._strings + start:self._strings + end]
+
+    def __len__(self):
+        """
+        Returns the number of leagues in the snapshot.
+        """
+        return self.numLeagues
+
+    def get_league(self, leagueId):
+        """
+        Returns a League built from the rows of league LEAGUEID. As with
+        LeagueStore.get_league, the Team with id i is the league's i-th team.
+
+        leagueId: an int
+        returns: a League object
+        """
+        nameId, divStart, divCount, teamStart, teamCount = \
+                self._ints(self._leagues, 5 * leagueId, 5)
+        league = League(self.get_string(nameId))
+        divisions = [self.get_string(d) for d in
+                     self._ints(self._divisions, divStart, divCount)]
+        for d in divisions:
+            league.add_division(d)
+        for teamId in self._ints(self._leagueTeams, teamStart, teamCount):
+            nameId, ownerId, teamLeague, division = \
+                    self._ints(self._teams, 4 * teamId, 4)
+            team_name = self.get_string(nameId)
+            league.create_team(team_name)
+            if ownerId >= 0:
+                league.get_team(team_name).set_owner(self.get_string(ownerId))
+            if division >= 0:
+                league.assign_team_to_division(team_name, divisions[division])
+        return league
+
+    def get_schedule(self, leagueId):
+        """
+        Returns the schedule of league LEAGUEID as a list of weeks of
+        (home team id, away team id) tuples (False for unfilled weeks), or
+        None if the snapshot has none for it.
+
+        leagueId: an int
+        returns: a list or None
+        """
+        start, weeks, slots = self._ints(self._schedules, 3 * leagueId, 3)
+        if start < 0:
+            return None
+        data = self._ints(self._scheduleData, start, weeks * slots * 2)
+        return _unpack_schedule(data, weeks, slots)
+
+    def get_matchups(self, leagueId, league):
+        """
+        Returns the schedule of league LEAGUEID as Matchups between the teams
+        of LEAGUE, a League returned by get_league(LEAGUEID).
+
+        returns: a list of lists of matchups, or None
+        """
+        schedule = self.get_schedule(leagueId)
+        if schedule == None:
+            return None
+        teamStart, teamCount = self._ints(self._leagues, 5 * leagueId + 3, 2)
+        teams = {}
+        for team in league:
+            teams[team.id] = team
+        local = {}
+        teamIds = self._ints(self._leagueTeams, teamStart, teamCount)
+        for i in xrange(len(teamIds)):
+            local[teamIds[i]] = teams[i]
+        result = []
+        for week in schedule:
+            if week == False:
+                result.append(False)
+            else:
+                result.append([Matchup(local[home], local[away])
+                               for home, away in week])
+        return result
+
+    def to_store(self):
+        """
+        Returns a LeagueStore holding everything in the snapshot, copying
+        each section in bulk.
+
+        returns: a LeagueStore
+        """
+        store = LeagueStore()
+        strings = [self.get_string(i) for i in xrange(self.numStrings)]
+        leagues = self._ints(self._leagues, 0, 5 * self.numLeagues)
+        divisions = self._ints(self._divisions, 0, self.numDivisions)
+        leagueTeams = self._ints(self._leagueTeams, 0, self.numLeagueTeams)
+        for l in xrange(self.numLeagues):
+            nameId, divStart, divCount, teamStart, teamCount = \
+                    leagues[5 * l:5 * l + 5]
+            store.leagueNames.append(strings[nameId])
+            store.leagueDivisions.append(
+                [strings[d] for d in divisions[divStart:divStart + divCount]])
+            store.leagueTeams.append(leagueTeams[teamStart:
+                                                 teamStart + teamCount])
+        teams = self._ints(self._teams, 0, 4 * self.numTeams)
+        store.teamNames = [strings[i] for i in teams[0::4]]
+        store.teamOwners = []
+        for ownerId in teams[1::4]:
+            if ownerId >= 0:
+                store.teamOwners.append(strings[ownerId])
+            else:
+                store.teamOwners.append(None)
+        store.teamLeague = teams[2::4]
+        store.teamDivision = teams[3::4]
+        for l in xrange(self.numLeagues):
+            schedule = self.get_schedule(l)
+            if schedule != None:
+                store.schedules[l] = schedule
+        return store
+
+    def close(self):
+        """
+        Unmaps the snapshot file.
+        """
+        self.map.close()
+
+def _unpack_schedule(data, weeks, slots):
+    """
+    Turns the flat schedule DATA of a snapshot back into a list of weeks of
+    (home, away) tuples (see LeagueSnapshot).
+    """
+    result = []
+    for w in xrange(weeks):
+        start = w * slots * 2
+        if slots > 0 and data[start] == SNAPSHOT_UNFILLED:
+            result.append(False)
+            continue
+        week = []
+        for i in xrange(start, start + slots * 2, 2):
+            if data[i] < 0:
+                break
+            week.append((data[i], data[i+1]))
+        result.append(week)
+    return result
+
+def _circle_rounds(numTeams):
+    """
+    Returns the rounds of a single round robin between NUMTEAMS teams,
+    numbered 0 to NUMTEAMS - 1, built with the circle method: one team stays
+    fixed while the others rotate around it. Home and away alternate so that
+    every team's games are as balanced as they can be.
+
+    numTeams: an even int
+    returns: a list of NUMTEAMS - 1 lists of (home, away) tuples
+    """
+    numRounds = numTeams - 1
+    rounds = []
+    for r in xrange(numRounds):
+        # the fixed team alternates home and away from round to round
+        if r % 2 == 0:
+            games = [(numRounds, r)]
+        else:
+            games = [(r, numRounds)]
+        for i in xrange(1, numTeams / 2):
+            first = (r + i) % numRounds
+            second = (r - i) % numRounds
+            if i % 2 == 0:
+                games.append((first, second))
+            else:
+                games.append((second, first))
+        rounds.append(games)
+    return rounds
+
+def _divisional_rounds(numDivisions, divisionSize):
+    """
+    Returns the rounds of a single round robin between NUMDIVISIONS
+    divisions of DIVISIONSIZE teams each, where team i is in division
+    i // DIVISIONSIZE. The first DIVISIONSIZE - 1 rounds are divisional: each
+    division runs the circle method on its own. Every later round pairs
+    teams of different divisions only. For those, each division is split
+    into two halves. The circle method over the halves is relabelled so
+    that one of its rounds pairs every half with its sibling, and that
+    round is dropped. In each remaining round, every pair of halves plays
+    all of its games over DIVISIONSIZE / 2 weeks by rotating one half
+    against the other. Which half of a pair hosts more often follows an
+    Eulerian orientation of the pairs, so every team ends up with at most
+    one more home than away game, or the reverse.
+
+    numDivisions: an int
+    divisionSize: an even int
+    returns: a list of numDivisions * divisionSize - 1 lists of (home, away)
+    tuples
+    """
+    rounds = []
+    for games in _circle_rounds(divisionSize):
+        roundGames = []
+        for d in xrange(numDivisions):
+            first = d * divisionSize
+            for home, away in games:
+                roundGames.append((first + home, first + away))
+        rounds.append(roundGames)
+    if numDivisions == 1:
+        return rounds
+    half = divisionSize / 2
+    halfRounds = _circle_rounds(2 * numDivisions)
+    # relabel so that halfRounds[0] pairs the two halves of each division
+    halves = [None] * (2 * numDivisions)
+    for d in xrange(numDivisions):
+        first, second = halfRounds[0][d]
+        halves[first] = range(d * divisionSize, d * divisionSize + half)
+        halves[second] = range(d * divisionSize + half, (d + 1) * divisionSize)
+    # every half meets an even number of other halves, so walking closed
+    # trails through the pairs orients each pair (favored, other) with every
+    # half favored in exactly half of its pairs
+    neighbors = {}
+    for games in halfRounds[1:]:
+        for x, y in games:
+            neighbors.setdefault(x, []).append(y)
+            neighbors.setdefault(y, []).append(x)
+    favored = set()
+    for start in sorted(neighbors):
+        while neighbors[start]:
+            x = start
+            while neighbors[x]:
+                y = neighbors[x].pop()
+                neighbors[y].remove(x)
+                favored.add((x, y))
+                x = y
+    for r in xrange(1, len(halfRounds)):
+        for shift in xrange(half):
+            roundGames = []
+            for x, y in halfRounds[r]:
+                if (x, y) not in favored:
+                    x, y = y, x
+                for i in xrange(half):
+                    home = halves[x][i]
+                    away = halves[y][(i + shift) % half]
+                    # the favored half hosts every other week
+                    if shift % 2 == 1:
+                        home, away = away, home
+                    roundGames.append((home, away))
+            rounds.append(roundGames)
+    return rounds
+
+def save_league(league, path, schedule=None):
+    """
+    Writes LEAGUE, and SCHEDULE if given, to the snapshot file PATH as the
+    only league of a LeagueStore (see LeagueStore.save).
+
+    league: a League object
+    path: a string
+    schedule: a list of lists of matchups or None
+    """
+    store = LeagueStore()
+    leagueId = store.add_from_league(league)
+    if schedule != None:
+        store.add_schedule(leagueId, schedule)
+    store.save(path)
+
+def load_league(path, leagueId=0):
+    """
+    Reads league LEAGUEID and its schedule from the snapshot file PATH.
+
+    path: a string
+    leagueId: an int
+    returns: a tuple (League, list of lists of matchups or None)
+    """
+    snapshot = LeagueSnapshot(path)
+    try:
+        league = snapshot.get_league(leagueId)
+        return (league, snapshot.get_matchups(leagueId, league))
+    finally:
+        snapshot.close()
+
+# the LeagueStore being worked on by pool workers (see LeagueStore._map)
+_poolStore = None
+
+def _schedule_store_league(args):
+    """
+    Worker for LeagueStore.schedule_all.
+
+    args: a tuple (leagueId, weeks, method, seed)
+    returns: a tuple (leagueId, schedule of store team id pairs or None)
+    """
+    leagueId, weeks, method, seed = args
+    league = _poolStore.get_league(leagueId)
+    teamIds = _poolStore.leagueTeams[leagueId]
+    try:
+        schedule = league.generate_schedule(weeks, method, seed=seed)
+    except (IndexError, ValueError):
+        return (leagueId, None)
+    result = []
+    for week in schedule:
+        if week == False:
+            result.append(False)
+        else:
+            result.append([(teamIds[game.homeTeam.id],
+                            teamIds[game.awayTeam.id]) for game in week])
+    return (leagueId, result)
+
+def _render_store_league(leagueId):
+    """
+    Worker for LeagueStore.render_all.
+
+    returns: a tuple (leagueId, string)
+    """
+    return (leagueId, str(_poolStore.get_league(leagueId)))
+
+def _schedule_to_names(schedule):
+    """
+    Returns SCHEDULE with each Matchup replaced by a (home name, away name)
+    tuple, leaving unfilled (False) weeks as they are.
+    """
+    result = []
+    for week in schedule:
+        if week == False:
+            result.append(False)
+        else:
+            result.append([(game.homeTeam.get_name(), game.awayTeam.get_name())
+                           for game in week])
+    return result
+
+def _schedule_from_names(league, weeks):
+    """
+    Returns the schedule of Matchups between the teams of LEAGUE described by
+    WEEKS (see _schedule_to_names).
+    """
+    schedule = []
+    for week in weeks:
+        if week == False:
+            schedule.append(False)
+        else:
+            schedule.append([Matchup(league.teams[home], league.teams[away])
+                             for home, away in week])
+    return schedule
+
+def shuffle_all_divisions(leagues, seed=None):
+    """
+    Reshuffles the divisions of every League in LEAGUES (see
+    League.shuffle_divisions) in one pass, drawing from a single random
+    number generator seeded with SEED, or from the random module if SEED is
+    None.
+
+    leagues: an iterable of League objects
+    seed: a hashable object or None
+    """
+    if seed != None:
+        rng = random.Random(seed)
+    else:
+        rng = random
+    for league in leagues:
+        league._deal_divisions(rng)
+
+def schedule_to_array(schedule):
+    """
+    Packs SCHEDULE into one flat array of team ids laid out as
+    week x slot x (home, away), the same layout as LeagueSnapshot schedule
+    data: short weeks are padded with -1 and unfilled weeks are filled with
+    SNAPSHOT_UNFILLED. There is at least one slot per week if any week is
+    unfilled, so the marker is kept even when no week was filled.
+
+    schedule: a list of weeks of Matchups or of (home id, away id) tuples
+    returns: a tuple (array of ints, weeks, slots per week)
+    """
+    slots = 0
+    for week in schedule:
+        if week == False:
+            slots = max(slots, 1)
+        elif len(week) > slots:
+            slots = len(week)
+    data = array('i')
+    for week in schedule:
+        if week == False:
+            data.extend([SNAPSHOT_UNFILLED] * (2 * slots))
+            continue
+        for game in week:
+            if isinstance(game, tuple):
+                data.extend(game)
+            else:
+                data.extend((game.homeTeam.id, game.awayTeam.id))
+        data.extend([-1] * (2 * (slots - len(week))))
+    return (data, len(schedule), slots)
+
+class ScheduleEvaluator(object):
+    """
+    Computes quality metrics for whole seasons of a league in one pass over
+    the season packed by schedule_to_array. Per-league lookups (team
+    divisions, the maxMatchups policy) are worked out once, so one evaluator
+    can score many candidate schedules of the same league quickly.
+    """
+    def __init__(self, league=None):
+        """
+        Initializes a ScheduleEvaluator for LEAGUE. Without a league,
+        division games are not counted and the number of teams is taken from
+        the schedules themselves.
+
+        league: a League object or None
+        """
+        self.size = 0
+        self.numTeams = None
+        self.divisionOf = None
+        if league != None:
+            self.numTeams = len(league.teams)
+            for team in league:
+                if team.id >= self.size:
+                    self.size = team.id + 1
+            divisionIds = {}
+            for i, d in enumerate(sorted(league.divisions)):
+                divisionIds[d] = i
+            self.divisionOf = array('i', [-1]) * self.size
+            for team in league:
+                self.divisionOf[team.id] = divisionIds.get(
+                    team.get_division(), -1)
+
+    def evaluate(self, schedule):
+        """
+        Returns the metrics of SCHEDULE (see evaluate_array).
+
+        schedule: a list of weeks of Matchups or of (home id, away id) tuples
+        returns: a dict
+        """
+        return self.evaluate_array(*schedule_to_array(schedule))
+
+    def evaluate_array(self, data, weeks, slots):
+        """
+        Returns a dict of metrics for the season packed in DATA:
+        unfilledWeeks, games, homeAway (home minus away games per team id),
+        homeAwaySquares and maxHomeAwayImbalance, rematches, minRematchGap
+        and meanRematchGap (in weeks, None without rematches),
+        backToBackRematches, divisionGames (None without a league),
+        maxMatchupsExcess (games beyond the maxMatchups limit
+        _generate_week applies in their week), spacingPenalty (weeks by
+        which rematches came sooner than a full round robin) and score
+        (homeAwaySquares + spacingPenalty, or None if a week is unfilled;
+        lower is better).
+
+        data: an array of ints (see schedule_to_array; an unfilled week
+        must hold SNAPSHOT_UNFILLED in its first slot)
+        weeks: an int
+        slots: an int
+        returns: a dict
+        """
+        size = self.size
+        for teamId in data:
+            if teamId >= size:
+                size = teamId + 1
+        numTeams = self.numTeams
+        if numTeams == None:
+            numTeams = 2 * slots
+        # a season with no games (or a league with no teams) has no
+        # maxMatchups policy to speak of
+        numTeams = max(numTeams, 1)
+        idealGap = max(numTeams - 1, 1)
+        divisionOf = self.divisionOf
+        homeAway = array('i', [0]) * size
+        pairCount = array('i', [0]) * (size * size)
+        lastMet = array('i', [-1]) * (size * size)
+        unfilled = games = rematches = gapTotal = backToBack = 0
+        divisionGames = excess = spacing = 0
+        minGap = None
+        i = 0
+        for weekNum in xrange(weeks):
+            maxMatchups = ((weekNum + 1) // numTeams) + 1
+            end = i + 2 * slots
+            if slots > 0 and data[i] == SNAPSHOT_UNFILLED:
+                unfilled += 1
+                i = end
+                continue
+            while i < end:
+                home = data[i]
+                away = data[i+1]
+                i += 2
+                if home < 0:
+                    continue
+                games += 1
+                homeAway[home] += 1
+                homeAway[away] -= 1
+                if home < away:
+                    pair = home * size + away
+                else:
+                    pair = away * size + home
+                count = pairCount[pair] + 1
+                pairCount[pair] = count
+                if count > maxMatchups:
+                    excess += 1
+                if lastMet[pair] >= 0:
+                    gap = weekNum - lastMet[pair]
+                    rematches += 1
+                    gapTotal += gap
+                    if minGap == None or gap < minGap:
+                        minGap = gap
+                    if gap == 1:
+                        backToBack += 1
+                    if gap < idealGap:
+                        spacing += idealGap - gap
+                lastMet[pair] = weekNum
+                if divisionOf != None and home < len(divisionOf) and \
+                        away < len(divisionOf) and divisionOf[home] >= 0 and \
+                        divisionOf[home] == divisionOf[away]:
+                    divisionGames += 1
+            i = end
+        squares = 0
+        maxImbalance = 0
+        for difference in homeAway:
+            squares += difference * difference
+            if abs(difference) > maxImbalance:
+                maxImbalance = abs(difference)
+        if rematches:
+            meanGap = float(gapTotal) / rematches
+        else:
+            meanGap = None
+        if divisionOf == None:
+            divisionGames = None
+        if unfilled:
+            score = None
+        else:
+            score = squares + spacing
+        return {'unfilledWeeks': unfilled,
+                'games': games,
+                'homeAway': list(homeAway),
+                'homeAwaySquares': squares,
+                'maxHomeAwayImbalance': maxImbalance,
+                'rematches': rematches,
+                'minRematchGap': minGap,
+                'meanRematchGap': meanGap,
+                'backToBackRematches': backToBack,
+                'divisionGames': divisionGames,
+                'maxMatchupsExcess': excess,
+                'spacingPenalty': spacing,
+                'score': score}
+
+class ScheduleOptimizer(object):
+    """
+    Simulated annealing over a feasible schedule, minimizing the same score
+    as score_schedule (home/away imbalance squared plus rematch spacing
+    penalty). Three moves keep every week a valid set of games:
+    flipping home and away in one game, swapping two whole weeks, and
+    re-pairing two games of one week, (a at b), (c at d) -> (a at d),
+    (c at b), which keeps every team's home/away count. A re-pair is only
+    tried if it keeps the number of division games and does not make any
+    pair meet more often than the most any pair meets in the original.
+
+    Each move's score change is worked out from the teams and pairs it
+    touches only: a running home-minus-away count per team and a sorted
+    list of meeting weeks per pair.
+    """
+    def __init__(self, league, schedule, rng=random):
+        """
+        Initializes a ScheduleOptimizer for SCHEDULE, a schedule of LEAGUE.
+
+        league: a League object
+        schedule: a list of lists of matchups (see League.generate_schedule)
+        rng: the random module or a random.Random object
+        """
+        self.rng = rng
+        self.teams = {}
+        for team in league:
+            self.teams[team.id] = team
+        self.idealGap = max(len(league.teams) - 1, 1)
+        self.divisionOf = {}
+        for team in league:
+            if team.get_division() in league.divisions:
+                self.divisionOf[team.id] = team.get_division()
+        # weeks of [home id, away id] games; unfilled weeks stay False
+        self.weeks = []
+        self.balance = {}
+        self.pairWeeks = {}
+        for weekNum in xrange(len(schedule)):
+            week = schedule[weekNum]
+            if week == False:
+                self.weeks.append(False)
+                continue
+            games = []
+            for game in week:
+                home = game.homeTeam.id
+                away = game.awayTeam.id
+                games.append([home, away])
+                self.balance[home] = self.balance.get(home, 0) + 1
+                self.balance[away] = self.balance.get(away, 0) - 1
+                self.pairWeeks.setdefault(self._pair(home, away),
+                                          []).append(weekNum)
+            self.weeks.append(games)
+        self.filledWeeks = [w for w in xrange(len(self.weeks))
+                            if self.weeks[w] != False]
+        self.maxMeetings = 0
+        for weeksMet in self.pairWeeks.values():
+            self.maxMeetings = max(self.maxMeetings, len(weeksMet))
+        self.score = 0
+        for difference in self.balance.values():
+            self.score += difference * difference
+        for weeksMet in self.pairWeeks.values():
+            self.score += self._spacing(weeksMet)
+        self.bestScore = self.score
+        self.best = self._copy_weeks()
+
+    def _pair(self, team, opponent):
+        if team < opponent:
+            return (team, opponent)
+        return (opponent, team)
+
+    def _spacing(self, weeksMet):
+        """
+        Returns the spacing penalty of a pair meeting in the sorted weeks
+        WEEKSMET.
+        """
+        penalty = 0
+        for k in xrange(1, len(weeksMet)):
+            gap = weeksMet[k] - weeksMet[k-1]
+            if gap < self.idealGap:
+                penalty += self.idealGap - gap
+        return penalty
+
+    def _copy_weeks(self):
+        result = []
+        for week in self.weeks:
+            if week == False:
+                result.append(False)
+            else:
+                result.append([tuple(game) for game in week])
+        return result
+
+    def _accept(self, delta, temperature):
+        if delta <= 0:
+            return True
+        if temperature <= 0:
+            return False
+        return self.rng.random() < math.exp(-delta / temperature)
+
+    def _try_flip(self, temperature):
+        week = self.weeks[self.rng.choice(self.filledWeeks)]
+        if not week:
+            return
+        game = self.rng.choice(week)
+        home, away = game
+        dHome = self.balance[home]
+        dAway = self.balance[away]
+        delta = (dHome - 2) ** 2 - dHome ** 2 + (dAway + 2) ** 2 - dAway ** 2
+        if self._accept(delta, temperature):
+            game[0], game[1] = away, home
+            self.balance[home] = dHome - 2
+            self.balance[away] = dAway + 2
+            self.score += delta
+
+    def _moved_penalty(self, pairs, moves):
+        """
+        Returns the change in spacing penalty if, for every pair in PAIRS,
+        each week w of its meetings becomes moves.get(w, w).
+        """
+        delta = 0
+        for pair in pairs:
+            weeksMet = self.pairWeeks[pair]
+            moved = sorted([moves.get(w, w) for w in weeksMet])
+            delta += self._spacing(moved) - self._spacing(weeksMet)
+        return delta
+
+    def _try_swap_weeks(self, temperature):
+        if len(self.filledWeeks) < 2:
+            return
+        first, second = self.rng.sample(self.filledWeeks, 2)
+        pairs = set()
+        for game in self.weeks[first] + self.weeks[second]:
+            pairs.add(self._pair(game[0], game[1]))
+        moves = {first: second, second: first}
+        delta = self._moved_penalty(pairs, moves)
+        if self._accept(delta, temperature):
+            for pair in pairs:
+                self.pairWeeks[pair] = sorted([moves.get(w, w) for w in
+                                               self.pairWeeks[pair]])
+            self.weeks[first], self.weeks[second] = \
+                    self.weeks[second], self.weeks[first]
+            self.score += delta
+
+    def _is_division_game(self, team, opponent):
+        division = self.divisionOf.get(team)
+        return division != None and division == self.divisionOf.get(opponent)
+
+    def _try_repair(self, temperature):
+        weekNum = self.rng.choice(self.filledWeeks)
+        week = self.weeks[weekNum]
+        if len(week) < 2:
+            return
+        firstGame, secondGame = self.rng.sample(week, 2)
+        a, b = firstGame
+        c, d = secondGame
+        if self._is_division_game(a, b) + self._is_division_game(c, d) != \
+                self._is_division_game(a, d) + self._is_division_game(c, b):
+            return
+        oldPairs = (self._pair(a, b), self._pair(c, d))
+        newPairs = (self._pair(a, d), self._pair(c, b))
+        for pair in newPairs:
+            if len(self.pairWeeks.get(pair, ())) >= self.maxMeetings:
+                return
+        delta = 0
+        for pair in oldPairs:
+            weeksMet = self.pairWeeks[pair]
+            remaining = [w for w in weeksMet if w != weekNum]
+            delta += self._spacing(remaining) - self._spacing(weeksMet)
+        for pair in newPairs:
+            weeksMet = self.pairWeeks.get(pair, [])
+            delta += self._spacing(sorted(weeksMet + [weekNum])) - \
+                     self._spacing(weeksMet)
+        if self._accept(delta, temperature):
+            for pair in oldPairs:
+                self.pairWeeks[pair].remove(weekNum)
+                if not self.pairWeeks[pair]:
+                    del self.pairWeeks[pair]
+            for pair in newPairs:
+                self.pairWeeks[pair] = sorted(self.pairWeeks.get(pair, []) +
+                                              [weekNum])
+            firstGame[1] = d
+            secondGame[1] = b
+            self.score += delta
+
+    def run(self, timeLimit=1.0, maxIterations=None, startTemperature=None):
+        """
+        Anneals for TIMELIMIT seconds or MAXITERATIONS moves, whichever ends
+        first, cooling linearly from STARTTEMPERATURE (defaults to the number
+        of teams) to 0, and keeps the best schedule seen.
+
+        timeLimit: a float, in seconds
+        maxIterations: an int or None
+        startTemperature: a float or None
+        returns: an int, the best score found
+        """
+        if not self.filledWeeks:
+            return self.bestScore
+        if startTemperature == None:
+            startTemperature = float(len(self.teams))
+        start = time.time()
+        progress = 0.0
+        iterations = 0
+        while progress < 1.0:
+            temperature = startTemperature * (1.0 - progress)
+            move = self.rng.random()
+            if move < 0.4:
+                self._try_flip(temperature)
+            elif move < 0.8:
+                self._try_repair(temperature)
+            else:
+                self._try_swap_weeks(temperature)
+            if self.score < self.bestScore:
+                self.bestScore = self.score
+                self.best = self._copy_weeks()
+            iterations += 1
+            if iterations % 64 == 0 or maxIterations != None:
+                progress = (time.time() - start) / timeLimit
+                if maxIterations != None:
+                    progress = max(progress,
+                                   float(iterations) / maxIterations)
+        return self.bestScore
+
+    def get_best_schedule(self):
+        """
+        Returns the best schedule found as lists of Matchups.
+
+        returns: a list of lists of matchups
+        """
+        schedule = []
+        for week in self.best:
+            if week == False:
+                schedule.append(False)
+            else:
+                schedule.append([Matchup(self.teams[home], self.teams[away])
+                                 for home, away in week])
+        return schedule
+
+def evaluate_schedule(schedule, league=None):
+    """
+    Returns the metrics of SCHEDULE for LEAGUE (see
+    ScheduleEvaluator.evaluate_array).
+
+    schedule: a list of weeks of Matchups or of (home id, away id) tuples
+    league: a League object or None
+    returns: a dict
+    """
+    return ScheduleEvaluator(league).evaluate(schedule)
+
+def score_schedule(schedule):
+    """
+    Scores the fairness of a schedule; lower is better. Every team adds the
+    square of the difference between its home and away games, and every
+    rematch adds how many weeks sooner it came than a full round robin
+    (number of teams - 1 weeks) after the previous meeting.
+
+    schedule: a list of lists of matchups (see League.generate_schedule)
+    returns: an int, or None if a week of the schedule could not be filled
+    """
+    return evaluate_schedule(schedule)['score']
+
+def _generate_candidate(args):
+    """
+    Worker for League.generate_best_schedule. Generates one schedule with
+    the given seed and scores it.
+
+    args: a tuple (League, weeks, method, seed)
+    returns: a tuple (score, list of weeks of (home id, away id) tuples),
+    or None if the schedule could not be completed
+    """
+    league, weeks, method, seed = args
+    schedule = league.generate_schedule(weeks, method, seed=seed)
+    score = score_schedule(schedule)
+    if score == None:
+        return None
+    weeks = []
+    for week in schedule:
+        weeks.append([(game.homeTeam.id, game.awayTeam.id) for game in week])
+    return (score, weeks)
+
+def _league_text(league):
+    """
+    Yields the lines of League.__str__, each ending in a newline.
+    """
+    yield 'League Name: ' + league.name + '\nTeams and Divisions:\n'
+    divisions = league.get_divisions()
+    for d in sorted(divisions.keys(), key=str.lower):
+        yield 'Division Name: ' + d + '\n'
+        if len(divisions[d]) > 0:
+            for t in divisions[d]:
+                yield '\t' + t + '\n'
+        else: yield '\t<empty>\n'
+
+def _league_csv(league):
+    yield 'division,team,owner\r\n'
+    divisions = league.get_divisions()
+    for d in sorted(divisions.keys(), key=str.lower):
+        for t in divisions[d]:
+            yield _csv_row((d, t, league.get_team(t).get_owner() or ''))
+
+def _league_json(league):
+    divisions = league.get_divisions()
+    teams = []
+    for d in sorted(divisions.keys(), key=str.lower):
+        for t in divisions[d]:
+            teams.append({'name': t, 'division': d,
+                          'owner': league.get_team(t).get_owner()})
+    yield json.dumps({'name': league.name, 'teams': teams}) + '\n'
+
+def _csv_row(values):
+    """
+    Returns VALUES as one CSV line, quoting fields that need it.
+    """
+    fields = []
+    for value in values:
+        value = str(value)
+        if ',' in value or '"' in value or '\n' in value or '\r' in value:
+            value = '"' + value.replace('"', '""') + '"'
+        fields.append(value)
+    return ','.join(fields) + '\r\n'
+
+def _schedule_text(schedule, startDate):
+    weekNum = 0
+    for week in schedule:
+        weekNum += 1
+        lines = ['Week ' + str(weekNum)]
+        if week == False:
+            lines.append('FALSE!')
+        else:
+            for game in week:
+                lines.append(str(game))
+        lines.append('')
+        yield '\n'.join(lines)
+
+def _schedule_csv(schedule, startDate):
+    yield 'week,home,away\r\n'
+    weekNum = 0
+    for week in schedule:
+        weekNum += 1
+        if week == False:
+            yield _csv_row((weekNum, '', ''))
+        else:
+            yield ''.join([_csv_row((weekNum, game.homeTeam, game.awayTeam))
+                           for game in week])
+
+def _schedule_json(schedule, startDate):
+    # one array of weeks; a week is an array of games, or null if unfilled
+    yield '['
+    separator = ''
+    for week in schedule:
+        if week == False:
+            yield separator + 'null'
+        else:
+            yield separator + json.dumps([{'home': str(game.homeTeam),
+                                           'away': str(game.awayTeam)}
+                                          for game in week])
+        separator = ',\n'
+    yield ']\n'
+
+def _ics_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;') \
+                .replace(',', '\\,').replace('\n', '\\n')
+
+def _ics_line(line):
+    """
+    Returns the content line LINE ended with CRLF and folded, as RFC 5545
+    requires, into lines of at most 75 octets; each continuation line
+    starts with a space. UTF-8 sequences are never split.
+    """
+    parts = []
+    limit = 75
+    while len(line) > limit:
+        cut = limit
+        while cut > 1 and 0x80 <= ord(line[cut]) < 0xc0:
+            cut -= 1
+        parts.append(line[:cut])
+        line = line[cut:]
+        limit = 74
+    parts.append(line)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _schedule_ics(schedule, startDate):
+    # one all-day event per game, a week apart
+    stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    yield ('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'
+           'PRODID:-//ff-scripts//league-manager//EN\r\n')
+    weekNum = 0
+    for week in schedule:
+        weekNum += 1
+        if week == False:
+            continue
+        day = startDate + datetime.timedelta(weeks=weekNum-1)
+        start = day.strftime('%Y%m%d')
+        end = (day + datetime.timedelta(days=1)).strftime('%Y%m%d')
+        lines = []
+        for slot in xrange(len(week)):
+            lines.append('BEGIN:VEVENT\r\n'
+                         'UID:' + start + '-' + str(slot) + '-' +
+                         hashlib.sha1(str(week[slot])).hexdigest()[:12] +
+                         '@ff-scripts\r\n'
+                         'DTSTAMP:' + stamp + '\r\n'
+                         'DTSTART;VALUE=DATE:' + start + '\r\n'
+                         'DTEND;VALUE=DATE:' + end + '\r\n' +
+                         _ics_line('SUMMARY:Week ' + str(weekNum) + ': ' +
+                                   _ics_text(str(week[slot]))) +
+                         'END:VEVENT\r\n')
+        yield ''.join(lines)
+    yield 'END:VCALENDAR\r\n'
+
+_LEAGUE_RENDERERS = {'text': _league_text, 'csv': _league_csv,
+                     'json': _league_json}
+_SCHEDULE_RENDERERS = {'text': _schedule_text, 'csv': _schedule_csv,
+                       'json': _schedule_json, 'ics': _schedule_ics}
+
+def _write_chunks(chunks, f, bufferSize):
+    """
+    Writes the strings in CHUNKS to F, joining them into writes of about
+    BUFFERSIZE characters.
+    """
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= bufferSize:
+            f.write(''.join(buffered))
+            buffered = []
+            size = 0
+    if buffered:
+        f.write(''.join(buffered))
+
+def write_league(league, f, format='text', bufferSize=65536):
+    """
+    Writes LEAGUE to the file-like object F as FORMAT: 'text' (as
+    League.__str__), 'csv' (division,team,owner rows) or 'json'.
+
+    league: a League object
+    f: a file-like object
+    format: a string
+    bufferSize: an int, the size in characters of each write
+    """
+    try:
+        renderer = _LEAGUE_RENDERERS[format]
+    except KeyError:
+        raise ValueError(str(format) + ' is not a league format.')
+    _write_chunks(renderer(league), f, bufferSize)
+
+def write_schedule(schedule, f, format='text', startDate=None,
+                   bufferSize=65536):
+    """
+    Writes SCHEDULE to the file-like object F as FORMAT: 'text' (as
+    print_schedule), 'csv' (week,home,away rows), 'json' (an array of weeks)
+    or 'ics' (an iCalendar file with one all-day event per game, week 1 on
+    STARTDATE). Weeks are rendered as they are reached, so SCHEDULE can be a
+    generator such as League.iter_schedule.
+
+    schedule: an iterable of lists of matchups
+    f: a file-like object
+    format: a string
+    startDate: a datetime.date or None (defaults to today)
+    bufferSize: an int, the size in characters of each write
+    """
+    try:
+        renderer = _SCHEDULE_RENDERERS[format]
+    except KeyError:
+        raise ValueError(str(format) + ' is not a schedule format.')
+    if startDate == None:
+        startDate = datetime.date.today()
+    _write_chunks(renderer(schedule, startDate), f, bufferSize)
+
+def print_schedule(schedule):
+    """
+    Prints each week of SCHEDULE as it is reached, so SCHEDULE can be a list
+    or a generator such as League.iter_schedule.
+
+    schedule: an iterable of lists of matchups
+    """
+    write_schedule(schedule, sys.stdout, bufferSize=0)
 
-grassmasters = League('Frozen Grassmasters of Lambeau')
-grassmasters.create_team('Training Camp Hookie')
-grassmasters.create_team('T-bone Chicken')
-grassmasters.create_team('Dark Helmet')
-grassmasters.create_team('Wish Sandwiches')
+if __name__ == '__main__':
+    grassmasters = League('Frozen Grassmasters of Lambeau')
+    grassmasters.create_team('Training Camp Hookie')
+    grassmasters.create_team('T-bone Chicken')
+    grassmasters.create_team('Dark Helmet')
+    grassmasters.create_team('Wish Sandwiches')
 
-grassmasters.create_team('Flaming Moes')
-grassmasters.create_team('Jello Puddin\' Pops')
-grassmasters.create_team('The Schlubs')
-grassmasters.create_team('Kentucky Clears')
+    grassmasters.create_team('Flaming Moes')
+    grassmasters.create_team('Jello Puddin\' Pops')
+    grassmasters.create_team('The Schlubs')
+    grassmasters.create_team('Kentucky Clears')
 
-grassmasters.create_team('Mother of Dragons')
-grassmasters.create_team('Demaryius Targaryen')
-grassmasters.create_team('Winter is Coming')
-grassmasters.create_team('King in the North')
+    grassmasters.create_team('Mother of Dragons')
+    grassmasters.create_team('Demaryius Targaryen')
+    grassmasters.create_team('Winter is Coming')
+    grassmasters.create_team('King in the North')
 
-grassmasters.add_division('Beer')
-grassmasters.add_division('Cheese')
-grassmasters.add_division('Sausage')
+    grassmasters.add_division('Beer')
+    grassmasters.add_division('Cheese')
+    grassmasters.add_division('Sausage')
 
-grassmasters.shuffle_divisions()
+    grassmasters.shuffle_divisions()
 
-print grassmasters
-print_schedule(grassmasters.generate_schedule(14))
+    print grassmasters
+    print_schedule(grassmasters.generate_schedule(14))